@@ -0,0 +1,136 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import httpx
+from bson import Binary
+
+import db
+import metrics
+from config import BOT_TOKEN, TELEGRAM_API_URL, AVATAR_TTL, AVATAR_CACHE_BYTES, AVATAR_STORE
+
+http = httpx.AsyncClient(
+    base_url=TELEGRAM_API_URL,
+    timeout=httpx.Timeout(10.0),
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+)
+store = db.db.get_collection("avatars") if AVATAR_STORE == "mongo" else None
+
+
+class Avatar:
+    __slots__ = ("user_id", "file_unique_id", "content", "fetched_at")
+
+    def __init__(self, user_id: int, file_unique_id: Optional[str], content: Optional[bytes],
+                 fetched_at: Optional[float] = None):
+        self.user_id = user_id
+        self.file_unique_id = file_unique_id
+        self.content = content
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+
+    @property
+    def size(self) -> int:
+        return len(self.content or b"")
+
+    @property
+    def stale(self) -> bool:
+        return time.time() - self.fetched_at > AVATAR_TTL
+
+
+class AvatarCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._data: "OrderedDict[int, Avatar]" = OrderedDict()
+
+    def get(self, user_id: int) -> Optional[Avatar]:
+        if (avatar := self._data.get(user_id)) is not None:
+            self._data.move_to_end(user_id)
+        return avatar
+
+    def put(self, avatar: Avatar):
+        if (old := self._data.pop(avatar.user_id, None)) is not None:
+            self.size -= old.size
+        self._data[avatar.user_id] = avatar
+        self.size += avatar.size
+        while self.size > self.max_bytes and len(self._data) > 1:
+            _, evicted = self._data.popitem(last=False)
+            self.size -= evicted.size
+
+
+cache = AvatarCache(AVATAR_CACHE_BYTES)
+_refreshing: Dict[int, asyncio.Task] = {}
+
+
+async def _telegram(method: str, **params) -> dict:
+    with metrics.timed("telegram", method):
+        response = await http.get(f"/bot{BOT_TOKEN}/{method}", params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+async def fetch(user_id: int, known: Optional[Avatar] = None) -> Avatar:
+    res = await _telegram("getUserProfilePhotos", user_id=user_id, limit=1)
+    if res["ok"] is not True or res["result"]["total_count"] == 0:
+        return Avatar(user_id, None, None)
+    photo = res["result"]["photos"][0][0]
+    if known is not None and known.file_unique_id == photo["file_unique_id"]:
+        return Avatar(user_id, known.file_unique_id, known.content)
+    file = await _telegram("getFile", file_id=photo["file_id"])
+    with metrics.timed("telegram", "download"):
+        response = await http.get(f"/file/bot{BOT_TOKEN}/{file['result']['file_path']}")
+    response.raise_for_status()
+    return Avatar(user_id, photo["file_unique_id"], response.content)
+
+
+async def _load(user_id: int) -> Optional[Avatar]:
+    if store is None:
+        return None
+    if (doc := await store.find_one({"_id": user_id})) is None:
+        return None
+    return Avatar(user_id, doc["file_unique_id"], doc["content"], doc["fetched_at"])
+
+
+async def _save(avatar: Avatar):
+    cache.put(avatar)
+    if store is not None:
+        await store.replace_one({"_id": avatar.user_id}, {
+            "_id": avatar.user_id,
+            "file_unique_id": avatar.file_unique_id,
+            "content": Binary(avatar.content) if avatar.content is not None else None,
+            "fetched_at": avatar.fetched_at
+        }, upsert=True)
+
+
+async def refresh(user_id: int, known: Optional[Avatar] = None) -> Avatar:
+    try:
+        with metrics.timed("avatar", "fetch"):
+            avatar = await fetch(user_id, known)
+    except (httpx.HTTPError, KeyError, ValueError):
+        if known is not None:
+            return known
+        return Avatar(user_id, None, None, fetched_at=0)
+    await _save(avatar)
+    return avatar
+
+
+def _refresh_in_background(avatar: Avatar):
+    if avatar.user_id in _refreshing:
+        return
+    task = asyncio.create_task(refresh(avatar.user_id, avatar))
+    _refreshing[avatar.user_id] = task
+    task.add_done_callback(lambda t: _refreshing.pop(avatar.user_id, None))
+
+
+async def get_avatar(user_id: int) -> Avatar:
+    if (avatar := cache.get(user_id)) is None and (avatar := await _load(user_id)) is not None:
+        cache.put(avatar)
+    if avatar is None:
+        if (task := _refreshing.get(user_id)) is not None:
+            return await asyncio.shield(task)
+        task = _refreshing[user_id] = asyncio.create_task(refresh(user_id))
+        task.add_done_callback(lambda t: _refreshing.pop(user_id, None))
+        return await asyncio.shield(task)
+    if avatar.stale:
+        _refresh_in_background(avatar)
+    return avatar
@@ -0,0 +1,30 @@
+import argparse
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main(args):
+    os.environ.setdefault("MONGO_CONNECTION", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "bench")
+    os.environ.setdefault("JWT_ALG", "HS256")
+    os.environ.setdefault("JWT_ACCESS_SECRET_KEY", "bench-secret")
+    os.environ.setdefault("BOT_TOKEN", "0:bench")
+    sys.path.insert(0, args.app_dir)
+    import security
+
+    secret = os.environ["JWT_ACCESS_SECRET_KEY"]
+    token = security.create_access_token(security.JwtPayload(sub="1", username="@bench"))
+    assert security.decode_jwt(token, secret)["sub"] == "1"
+    seconds = min(timeit.repeat(lambda: security.decode_jwt(token, secret), number=args.number, repeat=5))
+    print(f"app={args.app_dir} decode_jwt: {seconds / args.number * 1e6:.2f} us/call "
+          f"({args.number / seconds:,.0f} calls/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark of security.decode_jwt for a repeated token.")
+    parser.add_argument("--app-dir", default=ROOT, help="checkout to benchmark (default: this one)")
+    parser.add_argument("--number", type=int, default=20000)
+    main(parser.parse_args())
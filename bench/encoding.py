@@ -0,0 +1,69 @@
+import gzip
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+import responses  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+WEEK_TYPES = ("Чисельник", "Знаменник", "-")
+LESSONS = [{"_id": f"lesson-{i}", "name": f"Вища математика {i}", "short_name": f"ВМ{i}", "type": "лек.",
+            "teacher": f"Іваненко І.І. {i}", "zoom": "https://zoom.us/j/1234567890"} for i in range(30)]
+# Roughly what /schedule/ and /crud/<collection>/ return for a busy group.
+PAYLOADS = {
+    "schedule_all": [{"_id": f"s{w}{d}{n}", "day": "Понеділок", "day_number": d, "number": n, "week_type": week_type,
+                      "cabinet": f"{100 + n}", "lesson_id": LESSONS[(d * n) % 30]["_id"],
+                      "lesson": f"{LESSONS[(d * n) % 30]['short_name']} лек."}
+                     for w, week_type in enumerate(WEEK_TYPES) for d in range(1, 7) for n in range(1, 6)],
+    "schedule": [{"_id": f"s{w}{d}{n}", "day": "Понеділок", "day_number": d, "number": n, "week_type": week_type,
+                  "cabinet": f"{100 + n}", "lesson_id": LESSONS[(d * n) % 30]["_id"],
+                  "lesson": LESSONS[(d * n) % 30]}
+                 for w, week_type in enumerate(WEEK_TYPES) for d in range(1, 7) for n in range(1, 6)],
+    "birthdays": [{"_id": f"b{i}", "student_name": f"Студент Прізвище {i}", "date": f"{i % 28 + 1:02d}.{i % 12 + 1:02d}.2003",
+                   "day_of_year": i % 365 + 1} for i in range(500)],
+    "teachers": [{"_id": f"t{i}", "name": f"Викладач Прізвище Ім'я По-батькові {i}"} for i in range(200)],
+}
+
+
+def stdlib_dumps(content) -> bytes:
+    # What fastapi.responses.JSONResponse renders.
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def per_call(function, number: int) -> float:
+    return min(timeit.repeat(function, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    print(f"encoder: {'orjson' if responses.orjson is not None else 'stdlib fallback'}; "
+          f"brotli: {'installed' if brotli is not None else 'not installed'}\n")
+    print(f"{'payload':<14}{'items':>6}{'encoder us':>12}{'json us':>10}{'orjson us':>11}{'speedup':>9}")
+    for name, payload in PAYLOADS.items():
+        encoder = per_call(lambda: jsonable_encoder(payload), 50)
+        stdlib = per_call(lambda: stdlib_dumps(payload), 200)
+        fast = per_call(lambda: responses.dumps(payload), 200)
+        print(f"{name:<14}{len(payload):>6}{encoder:>12.0f}{stdlib:>10.0f}{fast:>11.0f}{stdlib / fast:>8.1f}x")
+
+    print(f"\n{'payload':<14}{'raw B':>8}{'gzip-9 B':>10}{'gzip us':>9}", end="")
+    print(f"{'br-4 B':>9}{'br us':>8}" if brotli is not None else "")
+    for name, payload in PAYLOADS.items():
+        body = responses.dumps(payload)
+        # Starlette's GZipMiddleware compresses at level 9; brotli-asgi defaults to quality 4.
+        compressed = gzip.compress(body, 9)
+        line = f"{name:<14}{len(body):>8}{len(compressed):>10}{per_call(lambda: gzip.compress(body, 9), 50):>9.0f}"
+        if brotli is not None:
+            line += f"{len(brotli.compress(body, quality=4)):>9}{per_call(lambda: brotli.compress(body, quality=4), 50):>8.0f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
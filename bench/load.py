@@ -0,0 +1,144 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+
+import httpx
+from jose import jwt
+
+import standin
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WEEK_TYPES = ("Чисельник", "Знаменник", "-")
+
+# name -> (method, path, authenticated)
+SCENARIOS = {
+    "schedule": ("GET", "/schedule/", False),
+    "schedule-week": ("GET", "/schedule/filtered/Чисельник", False),
+    "schedule-today": ("GET", "/schedule/filtered/today/Чисельник", False),
+    "teachers": ("GET", "/crud/teachers/", False),
+    "events": ("GET", "/events/", False),
+    "has-rights": ("GET", "/admins/has-rights/1", False),
+    "authorized": ("DELETE", "/crud/teachers/missing/", True),
+}
+
+
+def configure_environment():
+    os.environ.setdefault("MONGO_CONNECTION", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "bench")
+    os.environ.setdefault("JWT_ALG", "HS256")
+    os.environ.setdefault("JWT_ACCESS_SECRET_KEY", "bench-secret")
+    os.environ.setdefault("BOT_TOKEN", "0:bench")
+    os.environ.setdefault("COHERENCE_MODE", "off")
+    os.environ.setdefault("METRICS_ENABLED", "0")
+
+
+def seed(database):
+    lessons = [{"_id": f"l{i}", "name": f"Lesson {i}", "short_name": f"L{i}", "type": "лек.",
+                "teacher": f"Teacher {i}"} for i in range(20)]
+    schedule = [{"_id": f"s{w}{d}{n}", "day": f"Day {d}", "day_number": d, "number": n, "week_type": week_type,
+                 "cabinet": str(100 + n), "lesson_id": lessons[(d * n) % 20]["_id"],
+                 "lesson": lessons[(d * n) % 20]}
+                for w, week_type in enumerate(WEEK_TYPES) for d in range(1, 8) for n in range(1, 5)]
+    database.lessons.insert_many(lessons)
+    database.schedule.insert_many(schedule)
+    database.teachers.insert_many([{"_id": f"t{i}", "name": f"Teacher {i}"} for i in range(50)])
+    database.events.insert_many([{"_id": f"e{i}", "name": f"Event {i}", "description": "",
+                                  "date": "01.09.2030 10:00"} for i in range(20)])
+    database.admins.insert_one({"_id": "a1", "user_id": 1, "username": "@bench", "role": "super"})
+    database.week.insert_one({"_id": "w", "type": WEEK_TYPES[0]})
+    database.timetable.insert_one({"_id": "tt", "items": [
+        {"number": n, "start_hour": 8 + 2 * n, "start_minute": 0, "end_hour": 9 + 2 * n, "end_minute": 20,
+         "break": 20} for n in range(1, 5)]})
+
+
+def load_app(app_dir: str):
+    sys.path.insert(0, app_dir)
+    os.chdir(app_dir)
+    import main
+    return getattr(main.app, "app", main.app)
+
+
+class ServerThread(httpx.AsyncBaseTransport):
+    """Runs the app on its own event loop so a blocking handler stalls the server, not the clients' clocks."""
+
+    def __init__(self, app):
+        self.loop = asyncio.new_event_loop()
+        self.transport = httpx.ASGITransport(app=app)
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+    async def handle_async_request(self, request):
+        response = await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(self._handle(request), self.loop))
+        return httpx.Response(response[0], headers=response[1], content=response[2])
+
+    async def _handle(self, request):
+        response = await self.transport.handle_async_request(request)
+        # Forward the body as sent, still compressed, so it matches its Content-Encoding.
+        return response.status_code, response.headers, b"".join([chunk async for chunk in response.aiter_raw()])
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+async def run_scenario(client, method: str, path: str, headers: dict, requests: int, concurrency: int) -> dict:
+    for _ in range(min(20, requests)):
+        await client.request(method, path, headers=headers)
+    latencies = []
+    statuses = Counter()
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.request(method, path, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "rps": requests / elapsed,
+        "p50": percentile(latencies, 0.5) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "mean": statistics.mean(latencies) * 1000,
+        "statuses": dict(statuses)
+    }
+
+
+async def main(args):
+    token = jwt.encode({"sub": "1", "username": "@bench"}, os.environ["JWT_ACCESS_SECRET_KEY"],
+                       os.environ["JWT_ALG"])
+    app = load_app(args.app_dir)
+    print(f"app={args.app_dir} latency={args.latency_ms}ms requests={args.requests} "
+          f"concurrency={args.concurrency}")
+    print(f"{'scenario':<16}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}  statuses")
+    async with httpx.AsyncClient(transport=ServerThread(app), base_url="http://bench") as client:
+        for name in args.scenario or SCENARIOS:
+            method, path, authenticated = SCENARIOS[name]
+            headers = {"Authorization": f"Bearer {token}"} if authenticated else {}
+            result = await run_scenario(client, method, path, headers, args.requests, args.concurrency)
+            print(f"{name:<16}{result['rps']:>10.1f}{result['p50']:>10.2f}{result['p99']:>10.2f}  "
+                  f"{result['statuses']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="In-process load benchmark against an in-memory Mongo stand-in. "
+                    "Compare two revisions with --app-dir pointing at a `git worktree` of each.")
+    parser.add_argument("--app-dir", default=ROOT, help="checkout to benchmark (default: this one)")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="simulated Mongo round trip")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS))
+    arguments = parser.parse_args()
+    configure_environment()
+    seed(standin.install(arguments.latency_ms)[os.environ["DB_NAME"]])
+    asyncio.run(main(arguments))
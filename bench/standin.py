@@ -0,0 +1,117 @@
+import asyncio
+import functools
+import time
+
+COLLECTION_METHODS = (
+    "aggregate", "bulk_write", "count_documents", "count", "create_indexes", "delete_many", "delete_one",
+    "find_one", "find_one_and_delete", "find_one_and_replace", "find_one_and_update",
+    "insert_many", "insert_one", "replace_one", "update_many", "update_one"
+)
+ASYNC_COLLECTION_METHODS = tuple(name for name in COLLECTION_METHODS if name != "aggregate")
+
+# Depth of stand-in calls made through the async client. Those pay their
+# latency as asyncio.sleep, so the wrapped sync collection must not block.
+_async_depth = 0
+
+
+def _blocking(method, latency):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if not _async_depth:
+            time.sleep(latency)
+        return method(*args, **kwargs)
+    return wrapper
+
+
+def _first_batch_blocking(method, latency):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not _async_depth and not self.__dict__.get("_bench_fetched"):
+            self.__dict__["_bench_fetched"] = True
+            time.sleep(latency)
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _sync_section(method):
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        global _async_depth
+        _async_depth += 1
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            _async_depth -= 1
+    return wrapper
+
+
+def _non_blocking(method, latency):
+    method = _sync_section(method)
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        await asyncio.sleep(latency)
+        return await method(*args, **kwargs)
+    return wrapper
+
+
+def _first_batch_non_blocking(method, latency):
+    method = _sync_section(method)
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        if not self.__dict__.get("_bench_fetched"):
+            self.__dict__["_bench_fetched"] = True
+            await asyncio.sleep(latency)
+        return await method(self, *args, **kwargs)
+    return wrapper
+
+
+def _aggregate(method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        global _async_depth
+        _async_depth += 1
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _async_depth -= 1
+    return wrapper
+
+
+def install(latency_ms: float = 1.0):
+    """Point pymongo and motor at one in-memory mongomock server.
+
+    Every round trip costs ``latency_ms``. The sync client sleeps in the
+    calling thread, as a blocking pymongo call would, while the async client
+    yields to the event loop for the same time.
+    """
+    import mongomock
+    import mongomock.collection
+    import mongomock_motor
+    import motor.motor_asyncio
+    import pymongo
+
+    latency = latency_ms / 1000
+    server = mongomock.MongoClient()
+
+    for name in COLLECTION_METHODS:
+        if hasattr(mongomock.collection.Collection, name):
+            setattr(mongomock.collection.Collection, name,
+                    _blocking(getattr(mongomock.collection.Collection, name), latency))
+    mongomock.collection.Cursor.__next__ = _first_batch_blocking(mongomock.collection.Cursor.__next__, latency)
+
+    for name in ASYNC_COLLECTION_METHODS:
+        setattr(mongomock_motor.AsyncMongoMockCollection, name,
+                _non_blocking(getattr(mongomock_motor.AsyncMongoMockCollection, name), latency))
+    mongomock_motor.AsyncMongoMockCollection.find = _aggregate(mongomock_motor.AsyncMongoMockCollection.find)
+    mongomock_motor.AsyncMongoMockCollection.aggregate = _aggregate(
+        mongomock_motor.AsyncMongoMockCollection.aggregate)
+    for cursor in (mongomock_motor.AsyncCursor, mongomock_motor.AsyncLatentCommandCursor):
+        cursor.to_list = _first_batch_non_blocking(cursor.to_list, latency)
+        cursor.next = cursor.__anext__ = _first_batch_non_blocking(cursor.next, latency)
+
+    pymongo.MongoClient = lambda *args, **kwargs: server
+    motor.motor_asyncio.AsyncIOMotorClient = lambda *args, **kwargs: mongomock_motor.AsyncMongoMockClient(
+        mock_mongo_client=server)
+    return server
@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+import inspect
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Bucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class FakeBotApi:
+    """Answers sendMessage with Telegram's limits: 429 + retry_after when a chat, group or the bot is too fast."""
+
+    def __init__(self, speed: float, latency: float, error_rate: float):
+        self.speed = speed
+        self.latency = latency
+        self.error_rate = error_rate
+        self.global_bucket = Bucket(30 * speed, 30)
+        self.chats = {}
+        self.stats = Counter()
+        self.delivered = {}
+
+    def _bucket(self, chat_id) -> Bucket:
+        if chat_id not in self.chats:
+            group = str(chat_id).startswith("-")
+            self.chats[chat_id] = Bucket(20 / 60 * self.speed, 3) if group else Bucket(1 * self.speed, 3)
+        return self.chats[chat_id]
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self.latency)
+        body = httpx.Response(200, content=request.content).json()
+        self.stats["requests"] += 1
+        if random.random() < self.error_rate:
+            self.stats["5xx"] += 1
+            return httpx.Response(502, json={"ok": False, "description": "Bad Gateway"})
+        wait = max(self.global_bucket.take(), self._bucket(body["chat_id"]).take())
+        if wait > 0:
+            self.stats["429"] += 1
+            # Telegram sends whole seconds; keep the fraction so retry_after stays on the --speed time scale.
+            return httpx.Response(429, json={"ok": False, "description": "Too Many Requests",
+                                             "parameters": {"retry_after": round(wait, 3)}})
+        self.stats["ok"] += 1
+        self.delivered[body["text"]] = time.monotonic()
+        return httpx.Response(200, json={"ok": True, "result": {"message_id": self.stats["ok"]}})
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))] if values else float("nan")
+
+
+async def run(args):
+    sys.path.insert(0, args.app_dir)
+    import telegram
+
+    api = FakeBotApi(args.speed, args.latency_ms / 1000, args.error_rate)
+    options = {"workers": args.workers, "global_rate": 30 * args.speed, "chat_rate": 1 * args.speed,
+               "max_retries": 5, "base_url": "https://api.telegram.test", "token": "0:harness"}
+    if "group_rate" in inspect.signature(telegram.TelegramSender).parameters:
+        options["group_rate"] = 20 / 60 * args.speed
+    sender = telegram.TelegramSender(**options)
+    # The sender sizes its global burst as one second of traffic; keep that second on the real time scale.
+    sender.global_bucket = telegram.TokenBucket(30 * args.speed, 30)
+    sender.start()
+    await sender.http.aclose()
+    sender.http = httpx.AsyncClient(base_url=options["base_url"], transport=httpx.MockTransport(api))
+
+    random.seed(args.seed)
+    groups = [-1000 - i for i in range(args.groups)]
+    users = [100000 + i for i in range(args.users)]
+    plan = [("group", random.choice(groups)) for _ in range(args.group_messages)]
+    plan += [("private", random.choice(users)) for _ in range(args.messages - args.group_messages)]
+    # Group announcements go out first, the way a cron burst lands just before users try to log in.
+    queued = {}
+    futures = []
+    started = time.monotonic()
+    for i, (kind, chat_id) in enumerate(plan):
+        text = f"{kind}-{i}"
+        queued[text] = (kind, time.monotonic())
+        futures.append(sender.send_message(chat_id, text))
+    results = await asyncio.gather(*futures, return_exceptions=True)
+    elapsed = time.monotonic() - started
+    await sender.stop()
+
+    latencies = {"private": [], "group": []}
+    for text, (kind, enqueued) in queued.items():
+        if text in api.delivered:
+            latencies[kind].append((api.delivered[text] - enqueued) * args.speed)
+    failures = sum(isinstance(result, Exception) for result in results)
+    print(f"app={args.app_dir} messages={args.messages} (group {args.group_messages}) workers={args.workers} "
+          f"speed={args.speed}x")
+    print(f"wall {elapsed:.2f}s ({elapsed * args.speed:.1f}s at real rates), failures {failures}, "
+          f"api {dict(api.stats)}")
+    for kind, values in latencies.items():
+        print(f"{kind:<8} delivered {len(values):>4}  latency at real rates: "
+              f"p50 {percentile(values, 0.5):7.2f}s  p99 {percentile(values, 0.99):7.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Push messages through TelegramSender against a fake Bot API that enforces Telegram's "
+                    "rate limits. Rates are multiplied by --speed so the run finishes quickly; latencies are "
+                    "reported scaled back to real rates.")
+    parser.add_argument("--app-dir", default=ROOT, help="checkout to benchmark (default: this one)")
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--group-messages", type=int, default=20)
+    parser.add_argument("--groups", type=int, default=2)
+    parser.add_argument("--users", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--speed", type=float, default=10)
+    parser.add_argument("--latency-ms", type=float, default=5)
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,47 @@
+import os
+import sys
+import timeit
+from typing import List, Union
+
+from pydantic import parse_obj_as
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Admin, COLLECTION_MODELS, EitherModel, Timetable  # noqa: E402
+
+LESSON = {"_id": "l1", "name": "Math", "short_name": "M", "type": "лек.", "teacher": "T", "zoom": "немає"}
+SAMPLES = {
+    "birthdays": {"_id": "b1", "student_name": "Іван", "date": "01.02.2003"},
+    "lessons": LESSON,
+    "playlists": {"_id": "p1", "link": "https://example.com"},
+    "schedule": {"_id": "s1", "day": "Пн", "day_number": 1, "number": 1, "week_type": "-", "cabinet": "1",
+                 "lesson_id": "l1", "lesson": LESSON},
+    "teachers": {"_id": "t1", "name": "Іванов І.І."},
+    "week": {"_id": "w1", "type": "Чисельник"},
+    "cron": {"_id": "c1", "run": 1, "jobs": {name: {"run": 1, "description": name} for name in
+                                              ("check_schedule", "new_year", "check_birthday", "swap_week")}},
+}
+ExtendedEitherModel = List[Union[EitherModel, Admin, Timetable]]
+
+
+def per_call(function, number: int) -> float:
+    return min(timeit.repeat(function, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    print(f"{'create':<12}{'union us':>10}{'model us':>10}{'speedup':>9}  union picks")
+    for collection, item in SAMPLES.items():
+        union = per_call(lambda: parse_obj_as(EitherModel, item), 2000)
+        model = per_call(lambda: COLLECTION_MODELS[collection].parse_obj(item), 2000)
+        picked = type(parse_obj_as(EitherModel, item)).__name__
+        print(f"{collection:<12}{union:>10.1f}{model:>10.1f}{union / model:>8.1f}x  {picked}")
+
+    print(f"\n{'list of 100':<12}{'union ms':>10}  (read-path re-validation that list_items no longer does)")
+    for collection, item in SAMPLES.items():
+        documents = [dict(item, _id=f"{item['_id']}-{i}") for i in range(100)]
+        union = per_call(lambda: parse_obj_as(ExtendedEitherModel, documents), 50) / 1000
+        print(f"{collection:<12}{union:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import asyncio
+import calendar
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+import cache
+import db
+from models import birthday_fields
+from tenancy import PerTenant
+
+
+def reference_day(day: date) -> int:
+    return date(2000, day.month, day.day).timetuple().tm_yday
+
+
+def days_until(today: date, month: int, day: int) -> int:
+    for year in (today.year, today.year + 1):
+        try:
+            occurrence = date(year, month, day)
+        except ValueError:
+            occurrence = date(year, 3, 1)
+        if occurrence >= today:
+            return (occurrence - today).days
+    return 0
+
+
+def ranges(start: date, days: int) -> List[Tuple[int, int]]:
+    if days >= 365:
+        return [(1, 366)]
+    first, last = reference_day(start), reference_day(start + timedelta(days=days))
+    # Outside leap years 29.02 birthdays fall on 01.03, the day after 28.02.
+    if (start.month, start.day) == (3, 1) and not calendar.isleap(start.year):
+        first -= 1
+    if first <= last:
+        return [(first, last)]
+    return [(first, 366), (1, last)]
+
+
+class BirthdayIndex:
+    def __init__(self):
+        self._keys: Optional[List[int]] = None
+        self._items: List[dict] = []
+        self._lock: Optional[asyncio.Lock] = None
+
+    def invalidate(self, *args):
+        self._keys = None
+
+    async def _load(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._keys is not None:
+                return
+            backfill = []
+            async for birthday in db.birthdays.find({"day_of_year": {"$exists": False}}):
+                try:
+                    backfill.append(UpdateOne({"_id": birthday["_id"]}, {"$set": birthday_fields(birthday["date"])}))
+                except ValueError:
+                    continue
+            if backfill:
+                await db.birthdays.bulk_write(backfill, ordered=False)
+                cache.notify("birthdays")
+            self._items = await (db.birthdays.find({"day_of_year": {"$exists": True}},
+                                                   {"student_name": 1, "date": 1, "month": 1, "day": 1,
+                                                    "day_of_year": 1})
+                                 .sort("day_of_year")
+                                 .to_list(length=None))
+            self._keys = [birthday["day_of_year"] for birthday in self._items]
+
+    async def upcoming(self, today: date, days: int = 0) -> List[dict]:
+        if self._keys is None:
+            await self._load()
+        result = []
+        for first, last in ranges(today, days):
+            for birthday in self._items[bisect_left(self._keys, first):bisect_right(self._keys, last)]:
+                result.append({**birthday, "in_days": days_until(today, birthday["month"], birthday["day"])})
+        result.sort(key=lambda birthday: birthday["in_days"])
+        return result
+
+
+index = PerTenant(BirthdayIndex)
+cache.subscribe(("birthdays",), index.invalidate)
@@ -0,0 +1,72 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+import tenancy
+
+MISSING = object()
+
+caches: Dict[str, "TTLCache"] = {}
+_subscribers: Dict[str, List[Callable]] = {}
+
+
+class TTLCache:
+    def __init__(self, name: str, ttl: float, maxsize: Optional[int] = None):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._tenants: Dict[str, "OrderedDict[Hashable, tuple]"] = {}
+        caches[name] = self
+
+    @property
+    def _data(self) -> "OrderedDict[Hashable, tuple]":
+        return self._tenants.setdefault(tenancy.get_tenant(), OrderedDict())
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        if self.maxsize is not None:
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable = MISSING):
+        self.generation += 1
+        if key is MISSING:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "tenants": len(self._tenants),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "ttl": self.ttl
+        }
+
+
+def subscribe(collections: Iterable[str], callback: Callable):
+    for collection in collections:
+        _subscribers.setdefault(collection, []).append(callback)
+
+
+def notify(collection: str, upserted: Optional[List[dict]] = None, deleted: Optional[List[str]] = None):
+    for callback in _subscribers.get(collection, ()):
+        callback(collection, upserted, deleted)
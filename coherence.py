@@ -0,0 +1,146 @@
+import asyncio
+from typing import Dict, List
+
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure, PyMongoError
+
+import cache
+import db
+import tenancy
+from config import COHERENCE_MODE, COHERENCE_POLL_INTERVAL
+from versions import TRACKED
+
+# Every collection that issues ETags, plus the timetable behind /schedule/now.
+WATCHED = tuple(sorted(set(TRACKED) | {"timetable"}))
+CHANGE_STREAMS_UNSUPPORTED = (40573, 40324, 136)
+
+versions = db.db.get_collection("cache_versions")
+
+modes: Dict[str, str] = {}
+_seen: Dict[str, Dict[str, int]] = {}
+_dispatching = False
+_tasks: List[asyncio.Task] = []
+_pending = set()
+
+
+def dispatch(collection: str, upserted=None, deleted=None):
+    global _dispatching
+    _dispatching = True
+    try:
+        cache.notify(collection, upserted=upserted, deleted=deleted)
+    finally:
+        _dispatching = False
+
+
+def dispatch_change(change: dict):
+    collection = change["ns"]["coll"]
+    operation = change["operationType"]
+    if operation in ("insert", "update", "replace") and change.get("fullDocument") is not None:
+        dispatch(collection, upserted=[change["fullDocument"]])
+    elif operation == "delete":
+        dispatch(collection, deleted=[change["documentKey"]["_id"]])
+    else:
+        dispatch(collection)
+
+
+def seen() -> Dict[str, int]:
+    return _seen.setdefault(tenancy.get_tenant(), {})
+
+
+async def _bump(collection: str):
+    try:
+        document = await versions.find_one_and_update(
+            {"_id": collection}, {"$inc": {"v": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+    except PyMongoError:
+        return
+    last = seen().get(collection, 0)
+    if document["v"] <= last:
+        return
+    seen()[collection] = document["v"]
+    # Anything between our last seen version and this bump was written by
+    # another instance, and the poller will not report it now.
+    if document["v"] != last + 1:
+        dispatch(collection)
+
+
+def broadcast(collection: str, *args):
+    if modes.get(tenancy.get_tenant()) != "poll" or _dispatching:
+        return
+    task = asyncio.create_task(_bump(collection))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+cache.subscribe(WATCHED, broadcast)
+
+
+async def watch_changes():
+    resume_token = None
+    delay = 1
+    while True:
+        try:
+            async with db.db.watch([{"$match": {"ns.coll": {"$in": list(WATCHED)}}}],
+                                   full_document="updateLookup", resume_after=resume_token) as stream:
+                delay = 1
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    dispatch_change(change)
+        except OperationFailure as e:
+            if e.code in CHANGE_STREAMS_UNSUPPORTED:
+                raise
+            resume_token = None
+            for collection in WATCHED:
+                dispatch(collection)
+        except PyMongoError:
+            for collection in WATCHED:
+                dispatch(collection)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 60)
+
+
+async def poll_versions():
+    while True:
+        try:
+            documents = await versions.find({"_id": {"$in": list(WATCHED)}}).to_list(length=None)
+            break
+        except PyMongoError:
+            await asyncio.sleep(COHERENCE_POLL_INTERVAL)
+    for document in documents:
+        seen()[document["_id"]] = document["v"]
+    while True:
+        await asyncio.sleep(COHERENCE_POLL_INTERVAL)
+        try:
+            documents = await versions.find({"_id": {"$in": list(WATCHED)}}).to_list(length=None)
+        except PyMongoError:
+            continue
+        for document in documents:
+            if document["v"] > seen().get(document["_id"], 0):
+                seen()[document["_id"]] = document["v"]
+                dispatch(document["_id"])
+
+
+async def run():
+    tenant = tenancy.get_tenant()
+    if COHERENCE_MODE in ("auto", "change_stream"):
+        modes[tenant] = "change_stream"
+        try:
+            await watch_changes()
+        except OperationFailure:
+            if COHERENCE_MODE == "change_stream":
+                raise
+    modes[tenant] = "poll"
+    await poll_versions()
+
+
+def start():
+    if COHERENCE_MODE != "off" and not _tasks:
+        for _ in tenancy.each():
+            _tasks.append(asyncio.create_task(run()))
+
+
+async def stop():
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
@@ -2,8 +2,46 @@ import os
 
 MONGO_CONNECTION = os.getenv("MONGO_CONNECTION")
 DB_NAME = os.getenv("DB_NAME")
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", "default")
+TENANTS = os.getenv("TENANTS")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", 5000))
+SCHEDULE_CACHE_TTL = int(os.getenv("SCHEDULE_CACHE_TTL", 3600))
+WEEK_TYPE_CACHE_TTL = int(os.getenv("WEEK_TYPE_CACHE_TTL", 3600))
+ADMIN_CACHE_TTL = int(os.getenv("ADMIN_CACHE_TTL", 300))
+ADMIN_CACHE_SIZE = int(os.getenv("ADMIN_CACHE_SIZE", 1024))
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", 900))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 4096))
+LOGIN_ATTEMPT_TTL = int(os.getenv("LOGIN_ATTEMPT_TTL", 300))
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+COHERENCE_MODE = os.getenv("COHERENCE_MODE", "auto")
+COHERENCE_POLL_INTERVAL = float(os.getenv("COHERENCE_POLL_INTERVAL", 5))
 ENVIRONMENT = os.getenv("ENVIRONMENT")
 BOT_TOKEN = os.getenv("BOT_TOKEN")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+TELEGRAM_WORKERS = int(os.getenv("TELEGRAM_WORKERS", 4))
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", 30))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", 1))
+TELEGRAM_GROUP_RATE = float(os.getenv("TELEGRAM_GROUP_RATE", 20 / 60))
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", 5))
+AVATAR_TTL = int(os.getenv("AVATAR_TTL", 3600))
+AVATAR_CACHE_BYTES = int(os.getenv("AVATAR_CACHE_BYTES", 16 * 1024 * 1024))
+AVATAR_DEFAULT_URL = os.getenv("AVATAR_DEFAULT_URL", "https://ki2helper.pp.ua/assets/images/avatars/avatar_default.jpg")
+AVATAR_STORE = os.getenv("AVATAR_STORE", "memory")
 JWT_ALG = os.getenv("JWT_ALG")
 JWT_ACCESS_SECRET_KEY = os.getenv("JWT_ACCESS_SECRET_KEY")
 OWNER_ID = os.getenv("OWNER_ID")
+EVENTS_CHAT_ID = os.getenv("EVENTS_CHAT_ID")
+EVENTS_GRACE = int(os.getenv("EVENTS_GRACE", 3600))
+CRON_ENABLED = os.getenv("CRON_ENABLED", "0") == "1"
+CRON_CHAT_ID = os.getenv("CRON_CHAT_ID") or EVENTS_CHAT_ID
+CRON_JITTER = float(os.getenv("CRON_JITTER", 30))
+CRON_LEASE_TTL = int(os.getenv("CRON_LEASE_TTL", 600))
+CRON_SCHEDULES = {
+    "check_schedule": os.getenv("CRON_CHECK_SCHEDULE", "07:00"),
+    "new_year": os.getenv("CRON_NEW_YEAR", "01.01 00:00"),
+    "check_birthday": os.getenv("CRON_CHECK_BIRTHDAY", "09:00"),
+    "swap_week": os.getenv("CRON_SWAP_WEEK", "mon 00:00")
+}
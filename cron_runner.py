@@ -0,0 +1,194 @@
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict
+
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+import cache
+import db
+import tenancy
+import week_type
+from birthday_index import index as birthday_index
+from config import CRON_ENABLED, CRON_JITTER, CRON_LEASE_TTL, CRON_SCHEDULES
+from snapshot import snapshot
+from telegram import sender
+
+TIMEZONE = week_type.TIMEZONE
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+WEEK_TYPES = ("Чисельник", "Знаменник")
+WORKER_ID = uuid.uuid4().hex
+
+leases = db.db.get_collection("cron_leases")
+
+
+def next_run(spec: str, now: datetime) -> datetime:
+    *date_part, time_part = spec.split()
+    hour, minute = map(int, time_part.split(":"))
+    now = now.astimezone(TIMEZONE).replace(tzinfo=None)
+    candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if not date_part:
+        while candidate <= now:
+            candidate += timedelta(days=1)
+    elif date_part[0].lower() in WEEKDAYS:
+        candidate += timedelta(days=(WEEKDAYS.index(date_part[0].lower()) - now.weekday()) % 7)
+        if candidate <= now:
+            candidate += timedelta(days=7)
+    else:
+        day, month = map(int, date_part[0].split("."))
+        # 29.02 only exists in leap years, which are at most 8 years apart.
+        for year in range(now.year, now.year + 9):
+            try:
+                candidate = candidate.replace(year=year, month=month, day=day)
+            except ValueError:
+                continue
+            if candidate > now:
+                break
+        else:
+            raise ValueError(f"Cron schedule {spec!r} names a date that never occurs")
+    return TIMEZONE.localize(candidate)
+
+
+def chat_id():
+    return tenancy.settings()["cron_chat_id"]
+
+
+async def check_schedule(now: datetime):
+    if (current := await week_type.current_week_type()) is None:
+        return
+    entries = await snapshot.entries(current, now.weekday() + 1)
+    if not entries:
+        return
+    lines = [f"Розклад на сьогодні ({current}):"]
+    for entry in entries:
+        lesson = entry.get("lesson") or {}
+        lines.append(f"{entry['number']}. {lesson.get('short_name', '')} {lesson.get('type', '')} ({entry['cabinet']})")
+    await sender.send_message(chat_id(), "\n".join(lines))
+
+
+async def new_year(now: datetime):
+    await sender.send_message(chat_id(), f"З Новим {now.year + (now.month == 12)} роком!")
+
+
+async def check_birthday(now: datetime):
+    for birthday in await birthday_index.upcoming(now.date()):
+        await sender.send_message(chat_id(), f"Сьогодні день народження у {birthday['student_name']}!")
+
+
+async def swap_week(now: datetime):
+    if (document := await db.week.find_one()) is None:
+        return
+    document["type"] = WEEK_TYPES[1] if document["type"] == WEEK_TYPES[0] else WEEK_TYPES[0]
+    await db.week.update_one({"_id": document["_id"]}, {"$set": {"type": document["type"]}})
+    week_type.invalidate()
+    cache.notify("week", upserted=[document])
+
+
+JOBS: Dict[str, Callable[[datetime], Awaitable]] = {
+    "check_schedule": check_schedule,
+    "new_year": new_year,
+    "check_birthday": check_birthday,
+    "swap_week": swap_week
+}
+
+
+class JobStats:
+    __slots__ = ("runs", "failures", "skipped", "last_outcome", "last_duration", "last_run", "next_run")
+
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_outcome = None
+        self.last_duration = None
+        self.last_run = None
+        self.next_run = None
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+stats: Dict[str, Dict[str, JobStats]] = {}
+_tasks = []
+
+
+def tenant_stats() -> Dict[str, JobStats]:
+    return stats.setdefault(tenancy.get_tenant(), {name: JobStats() for name in JOBS})
+
+
+async def enabled(name: str) -> bool:
+    document = await db.cron.find_one()
+    return bool(document and document.get("run") and document["jobs"].get(name, {}).get("run"))
+
+
+async def acquire(name: str, slot: str) -> bool:
+    now = datetime.utcnow()
+    try:
+        await leases.find_one_and_update(
+            {"_id": name, "slot": {"$ne": slot},
+             "$or": [{"expires_at": {"$lt": now}}, {"expires_at": {"$exists": False}}]},
+            {"$set": {"slot": slot, "owner": WORKER_ID, "expires_at": now + timedelta(seconds=CRON_LEASE_TTL)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def execute(name: str, slot: datetime):
+    job_stats = tenant_stats()[name]
+    if not await enabled(name):
+        job_stats.skipped += 1
+        job_stats.last_outcome = "disabled"
+        return
+    if not await acquire(name, slot.isoformat()):
+        job_stats.skipped += 1
+        job_stats.last_outcome = "leased"
+        return
+    started = time.perf_counter()
+    try:
+        await JOBS[name](slot)
+        outcome = "ok"
+    except Exception as e:
+        job_stats.failures += 1
+        outcome = f"error: {e!r}"
+    job_stats.runs += 1
+    job_stats.last_duration = time.perf_counter() - started
+    job_stats.last_outcome = outcome
+    job_stats.last_run = datetime.utcnow()
+    await leases.update_one({"_id": name}, {"$set": {
+        "owner": WORKER_ID,
+        "outcome": outcome,
+        "duration": job_stats.last_duration,
+        "finished_at": job_stats.last_run
+    }})
+
+
+async def loop(name: str, spec: str):
+    while True:
+        slot = next_run(spec, datetime.now(tz=TIMEZONE))
+        tenant_stats()[name].next_run = slot
+        await asyncio.sleep(max(0.0, (slot - datetime.now(tz=TIMEZONE)).total_seconds())
+                            + random.uniform(0, CRON_JITTER))
+        try:
+            await execute(name, slot)
+        except PyMongoError as e:
+            tenant_stats()[name].failures += 1
+            tenant_stats()[name].last_outcome = f"error: {e!r}"
+
+
+def start():
+    if CRON_ENABLED and not _tasks:
+        for spec in CRON_SCHEDULES.values():
+            next_run(spec, datetime.now(tz=TIMEZONE))
+        for _ in tenancy.each():
+            _tasks.extend(asyncio.create_task(loop(name, CRON_SCHEDULES[name])) for name in JOBS)
+
+
+async def stop():
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
@@ -1,8 +1,49 @@
-from pymongo import MongoClient
-from config import MONGO_CONNECTION, DB_NAME
+import asyncio
+from datetime import datetime
 
-client = MongoClient(MONGO_CONNECTION)
-db = client[DB_NAME]
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, ASCENDING
+from pymongo.errors import PyMongoError
+import metrics
+import tenancy
+from config import MONGO_CONNECTION, MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_TIMEOUT_MS, \
+    LOGIN_ATTEMPT_TTL
+
+client = AsyncIOMotorClient(
+    MONGO_CONNECTION,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    serverSelectionTimeoutMS=MONGO_TIMEOUT_MS,
+    connectTimeoutMS=MONGO_TIMEOUT_MS,
+    socketTimeoutMS=MONGO_TIMEOUT_MS * 2,
+    event_listeners=metrics.listeners()
+)
+
+
+class TenantCollection:
+    def __init__(self, name: str):
+        self.name = name
+
+    def __getattr__(self, attr: str):
+        return getattr(current_database()[self.name], attr)
+
+
+class TenantDatabase:
+    def __getitem__(self, name: str) -> TenantCollection:
+        return TenantCollection(name)
+
+    def get_collection(self, name: str) -> TenantCollection:
+        return TenantCollection(name)
+
+    def __getattr__(self, attr: str):
+        return getattr(current_database(), attr)
+
+
+def current_database():
+    return client[tenancy.settings()["db"]]
+
+
+db = TenantDatabase()
 
 admins = db.get_collection("admins")
 birthdays = db.get_collection("birthdays")
@@ -11,7 +52,94 @@ login_attempts = db.get_collection("login_attempts")
 playlists = db.get_collection("playlists")
 lessons = db.get_collection("lessons")
 schedule = db.get_collection("schedule")
+schedule_view = db.get_collection("schedule_view")
 teachers = db.get_collection("teachers")
 timetable = db.get_collection("timetable")
 week = db.get_collection("week")
 events = db.get_collection("events")
+
+INDEXES = {
+    "admins": [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        IndexModel([("username", ASCENDING)], name="username")
+    ],
+    "login_attempts": [
+        IndexModel([("user_id", ASCENDING), ("otp", ASCENDING)], name="user_id_otp"),
+        IndexModel([("attempt_date", ASCENDING)], name="attempt_date_ttl", expireAfterSeconds=LOGIN_ATTEMPT_TTL)
+    ],
+    "schedule": [
+        IndexModel([("day_number", ASCENDING), ("week_type", ASCENDING), ("number", ASCENDING)],
+                   name="day_number_week_type_number"),
+        IndexModel([("week_type", ASCENDING), ("day_number", ASCENDING), ("number", ASCENDING)],
+                   name="week_type_day_number_number"),
+        IndexModel([("lesson_id", ASCENDING)], name="lesson_id"),
+        IndexModel([("lesson._id", ASCENDING)], name="lesson._id")
+    ],
+    "birthdays": [
+        IndexModel([("day_of_year", ASCENDING)], name="day_of_year")
+    ],
+    "schedule_view": [
+        IndexModel([("day_number", ASCENDING), ("week_type", ASCENDING), ("number", ASCENDING)],
+                   name="day_number_week_type_number")
+    ]
+}
+
+HOT_QUERIES = {
+    "admins by username": ("admins", {"username": "@tgadmin"}, None),
+    "admins by user_id": ("admins", {"user_id": 0}, None),
+    "login_attempts by otp": ("login_attempts", {"_id": "", "user_id": 0, "username": "@tgadmin", "otp": 0,
+                                                 "attempt_date": {"$gte": datetime(1970, 1, 1)}}, None),
+    "schedule by day": ("schedule", {"day_number": 1, "$or": [{"week_type": "Чисельник"}, {"week_type": "-"}]},
+                        [("number", ASCENDING)]),
+    "schedule by week": ("schedule", {"$or": [{"week_type": "Чисельник"}, {"week_type": "-"}]},
+                         [("day_number", ASCENDING), ("number", ASCENDING)])
+}
+
+index_results = {}
+
+
+async def ensure_indexes():
+    for tenant in tenancy.TENANTS:
+        with tenancy.use(tenant):
+            results = index_results.setdefault(tenant, {})
+            for name, indexes in INDEXES.items():
+                try:
+                    results[name] = await db[name].create_indexes(indexes)
+                except PyMongoError as e:
+                    results[name] = str(e)
+            try:
+                purged = await login_attempts.delete_many({"attempt_date": {"$type": "string"}})
+                results["legacy_login_attempts"] = purged.deleted_count
+            except PyMongoError as e:
+                results["legacy_login_attempts"] = str(e)
+
+
+def ensure_indexes_in_background() -> asyncio.Task:
+    return asyncio.create_task(ensure_indexes())
+
+
+def _stages(plan: dict) -> list:
+    stages = [{"stage": plan.get("stage"), "index": plan.get("indexName")}]
+    for child in ("inputStage", "queryPlan"):
+        if child in plan:
+            stages += _stages(plan[child])
+    for child in plan.get("inputStages", ()):
+        stages += _stages(child)
+    return stages
+
+
+async def explain_hot_queries() -> dict:
+    report = {}
+    for name, (collection, query, sort) in HOT_QUERIES.items():
+        cursor = db[collection].find(query)
+        if sort is not None:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        stages = _stages(explain["queryPlanner"]["winningPlan"])
+        report[name] = {
+            "collection": collection,
+            "stages": stages,
+            "collection_scan": any(stage["stage"] == "COLLSCAN" for stage in stages),
+            "docs_examined": explain.get("executionStats", {}).get("totalDocsExamined")
+        }
+    return report
@@ -0,0 +1,99 @@
+import time
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+import db
+from cache import subscribe
+from models import Timetable
+from snapshot import ScheduleSnapshot, WEEK_TYPES, snapshot
+from tenancy import PerTenant
+
+
+class Interval:
+    __slots__ = ("number", "start", "end", "break_", "lesson")
+
+    def __init__(self, number: int, start: int, end: int, break_: int, lesson: Optional[dict]):
+        self.number = number
+        self.start = start
+        self.end = end
+        self.break_ = break_
+        self.lesson = lesson
+
+    def as_dict(self) -> dict:
+        return {
+            "number": self.number,
+            "start": f"{self.start // 60:02d}:{self.start % 60:02d}",
+            "end": f"{self.end // 60:02d}:{self.end % 60:02d}",
+            "break": self.break_,
+            "lesson": self.lesson
+        }
+
+
+class DayIndex:
+    def __init__(self, intervals: List[Interval]):
+        self.intervals = sorted(intervals, key=lambda i: i.start)
+        self.starts = [interval.start for interval in self.intervals]
+
+    def lookup(self, minute: int) -> Tuple[Optional[Interval], Optional[Interval]]:
+        position = bisect_right(self.starts, minute)
+        current = None
+        if position and minute < self.intervals[position - 1].end:
+            current = self.intervals[position - 1]
+        upcoming = next((interval for interval in self.intervals[position:] if interval.lesson is not None), None)
+        return current, upcoming
+
+
+class LessonIndex:
+    def __init__(self, snapshot: ScheduleSnapshot):
+        self.snapshot = snapshot
+        self._timetable: Optional[List[dict]] = None
+        self._loaded_at = 0.0
+        self._days: Dict[Tuple[str, int], DayIndex] = {}
+        self._version = None
+
+    def invalidate(self, *args):
+        self._timetable = None
+        self._days = {}
+
+    async def _load_timetable(self) -> List[dict]:
+        if self._timetable is None or time.monotonic() - self._loaded_at > self.snapshot.ttl:
+            self._loaded_at = time.monotonic()
+            document = await db.timetable.find_one()
+            items = Timetable.parse_obj(document).items if document is not None else []
+            self._timetable = [item.dict() for item in items]
+            self._days = {}
+        return self._timetable
+
+    async def day(self, week_type: str, day_number: int) -> DayIndex:
+        timetable = await self._load_timetable()
+        entries = await self.snapshot.entries(week_type, day_number)
+        if self._version != self.snapshot.version:
+            self._days = {}
+            self._version = self.snapshot.version
+        if (index := self._days.get((week_type, day_number))) is None:
+            lessons = {entry["number"]: entry for entry in entries}
+            index = DayIndex([
+                Interval(item["number"],
+                         item["start_hour"] * 60 + item["start_minute"],
+                         item["end_hour"] * 60 + item["end_minute"],
+                         item["break_"],
+                         lessons.get(item["number"]))
+                for item in timetable
+            ])
+            if week_type in WEEK_TYPES:
+                self._days[(week_type, day_number)] = index
+        return index
+
+    async def now(self, week_type: str, day_number: int, minute: int) -> dict:
+        current, upcoming = (await self.day(week_type, day_number)).lookup(minute)
+        return {
+            "week_type": week_type,
+            "day_number": day_number,
+            "time": f"{minute // 60:02d}:{minute % 60:02d}",
+            "current": current.as_dict() if current is not None else None,
+            "next": upcoming.as_dict() if upcoming is not None else None
+        }
+
+
+lesson_index = PerTenant(lambda: LessonIndex(snapshot), LessonIndex)
+subscribe(("timetable",), lesson_index.invalidate)
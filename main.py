@@ -1,16 +1,34 @@
-import requests
+import avatars
+import coherence
+import cron_runner
 import db
+import metrics
+import tenancy
+from scheduler import scheduler
+from telegram import sender
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from config import COMPRESSION_MIN_SIZE
+from responses import FastJSONResponse
 from routes.auth import router as auth_router
 from routes.admin import router as admin_router
 from routes.crud import router as crud_router
 from routes.schedule import router as schedule_router
 from routes.events import router as events_router
+from routes.birthdays import router as birthdays_router
+from routes.metrics import router as metrics_router
 
 from deta import App
 
-app = App(FastAPI(docs_url=None))
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
+app = App(FastAPI(docs_url=None, default_response_class=FastJSONResponse))
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(tenancy.TenantMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -19,17 +37,40 @@ app.add_middleware(
     ],
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["X-Next-After", "ETag"]
 )
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MIN_SIZE, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
+
+@app.on_event("startup")
+async def startup_db_client():
+    app.state.index_task = db.ensure_indexes_in_background()
+    sender.start()
+    coherence.start()
+    for _ in tenancy.each():
+        scheduler.start()
+    cron_runner.start()
 
 
 @app.on_event("shutdown")
-def shutdown_db_client():
+async def shutdown_db_client():
+    await cron_runner.stop()
+    for _ in tenancy.each():
+        await scheduler.stop()
+    await coherence.stop()
+    await sender.stop()
+    await avatars.http.aclose()
     db.client.close()
 
 
 app.include_router(schedule_router)
 app.include_router(events_router)
+app.include_router(birthdays_router)
 app.include_router(crud_router)
 app.include_router(auth_router)
-app.include_router(admin_router)
\ No newline at end of file
+app.include_router(admin_router)
+app.include_router(metrics_router)
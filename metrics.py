@@ -0,0 +1,139 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+from config import METRICS_ENABLED
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+histograms: Dict[str, "Histogram"] = {}
+
+
+class Histogram:
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...], buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        histograms[name] = self
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            if (series := self._series.get(labels)) is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in sorted(series):
+            pairs = [f'{name}="{escape(value)}"' for name, value in zip(self.labelnames, labels)]
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{{{','.join([*pairs, le])}}} {cumulative}")
+            lines.append(f"{self.name}_sum{{{','.join(pairs)}}} {total}")
+            lines.append(f"{self.name}_count{{{','.join(pairs)}}} {cumulative}")
+        return lines
+
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+request_duration = Histogram("http_request_duration_seconds", "HTTP request latency by route",
+                             ("method", "route", "status"))
+request_mongo_commands = Histogram("http_request_mongo_commands", "Mongo commands issued per HTTP request",
+                                   ("method", "route"), COUNT_BUCKETS)
+request_mongo_duration = Histogram("http_request_mongo_seconds", "Time spent in Mongo per HTTP request",
+                                   ("method", "route"))
+dependency_duration = Histogram("dependency_duration_seconds", "Latency of calls to Mongo, Telegram and CPU hot spots",
+                                ("dependency", "operation"))
+
+_mongo_calls: ContextVar[Optional[list]] = ContextVar("mongo_calls", default=None)
+_routes: Dict[object, str] = {}
+
+
+@contextmanager
+def timed(dependency: str, operation: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        dependency_duration.observe(time.perf_counter() - started, dependency, operation)
+
+
+class MongoListener(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+    def _record(self, event):
+        duration = event.duration_micros / 1e6
+        dependency_duration.observe(duration, "mongo", event.command_name)
+        if (calls := _mongo_calls.get()) is not None:
+            calls.append(duration)
+
+
+def listeners() -> list:
+    return [MongoListener()] if METRICS_ENABLED else []
+
+
+def route_name(scope) -> str:
+    if (endpoint := scope.get("endpoint")) is None:
+        return "unmatched"
+    if endpoint not in _routes:
+        _routes.update((route.endpoint, route.path) for route in scope["app"].router.routes
+                       if hasattr(route, "endpoint"))
+    return _routes.get(endpoint, "unmatched")
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        calls = []
+        token = _mongo_calls.set(calls)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _mongo_calls.reset(token)
+            method, route = scope["method"], route_name(scope)
+            request_duration.observe(elapsed, method, route, status_code)
+            request_mongo_commands.observe(len(calls), method, route)
+            request_mongo_duration.observe(sum(calls), method, route)
+
+
+def render() -> str:
+    return "\n".join(line for histogram in histograms.values() for line in histogram.render()) + "\n"
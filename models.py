@@ -2,7 +2,7 @@ import uuid
 import random
 from datetime import datetime
 from typing import Optional, List, Union
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, root_validator
 
 
 class Job(BaseModel):
@@ -80,10 +80,29 @@ class CronUpdate(BaseModel):
         }
 
 
+def birthday_fields(date: str) -> dict:
+    day, month = map(int, date.split(".")[:2])
+    return {"month": month, "day": day, "day_of_year": datetime(2000, month, day).timetuple().tm_yday}
+
+
+def normalize_birthday(cls, values):
+    if values.get("date") is not None:
+        try:
+            values.update(birthday_fields(values["date"]))
+        except ValueError:
+            raise ValueError("date must be in DD.MM format")
+    return values
+
+
 class Birthday(BaseModel):
     id: str = Field(default_factory=uuid.uuid4, alias="_id")
     student_name: str = Field(...)
     date: str = Field(...)
+    month: Optional[int]
+    day: Optional[int]
+    day_of_year: Optional[int]
+
+    _normalize = root_validator(skip_on_failure=True, allow_reuse=True)(normalize_birthday)
 
     class Config:
         allow_population_by_field_name = True
@@ -99,6 +118,11 @@ class Birthday(BaseModel):
 class BirthdayUpdate(BaseModel):
     student_name: Optional[str]
     date: Optional[str]
+    month: Optional[int]
+    day: Optional[int]
+    day_of_year: Optional[int]
+
+    _normalize = root_validator(skip_on_failure=True, allow_reuse=True)(normalize_birthday)
 
     class Config:
         schema_extra = {
@@ -272,7 +296,14 @@ class Schedule(BaseModel):
     number: int = Field(...)
     week_type: str = Field(...)
     cabinet: str = Field(...)
-    lesson: Lesson = Field(...)
+    lesson_id: Optional[str] = Field(default=None)
+    lesson: Optional[Lesson] = Field(default=None)
+
+    @root_validator(skip_on_failure=True)
+    def check_lesson(cls, values):
+        if values.get("lesson_id") is None and values.get("lesson") is None:
+            raise ValueError("either lesson_id or lesson is required")
+        return values
 
     class Config:
         allow_population_by_field_name = True
@@ -283,6 +314,7 @@ class Schedule(BaseModel):
             "number": 2,
             "week_type": "Чисельник",
             "cabinet": "1-208",
+            "lesson_id": "066de609-b04a-4b30-b46c-32537c7f1f6e",
             "lesson": {
                 "name": "Lesson 1",
                 "short_name": "L1",
@@ -299,6 +331,7 @@ class ScheduleUpdate(BaseModel):
     number: Optional[int]
     week_type: Optional[str]
     cabinet: Optional[str]
+    lesson_id: Optional[str]
     lesson: Optional[Lesson]
 
     class Config:
@@ -339,7 +372,7 @@ class LoginAttempt(BaseModel):
     otp: int = Field(default_factory=gen_otp)
     is_magic: bool = Field(default=False)
     message_id: int = Field(default=0)
-    attempt_date: str = Field(default_factory=datetime.utcnow)
+    attempt_date: Union[datetime, str] = Field(default_factory=datetime.utcnow)
 
     class Config:
         allow_population_by_field_name = True
@@ -379,6 +412,28 @@ class BulkDelete(BaseModel):
         }
 
 
+class BulkUpdateItem(BaseModel):
+    id: str = Field(..., alias="_id")
+    update: dict = Field(...)
+
+    class Config:
+        allow_population_by_field_name = True
+
+
+class BulkWrite(BaseModel):
+    create: List[dict] = Field(default_factory=list)
+    update: List[BulkUpdateItem] = Field(default_factory=list)
+    upsert: List[dict] = Field(default_factory=list)
+
+    class Config:
+        allow_population_by_field_name = True
+        schema_extra = {
+            "create": [{"name": "Іванов І.І."}],
+            "update": [{"_id": "066de609-b04a-4b30-b46c-32537c7f1f6e", "update": {"name": "Іванов О.І."}}],
+            "upsert": [{"_id": "066de609-b04a-4b30-b46c-78273l1j8j1b", "name": "Петров П.П."}]
+        }
+
+
 EitherModel = Union[
         Birthday,
         Lesson,
@@ -415,3 +470,27 @@ class ScheduledEvent(BaseModel):
             "description": "Any info, including links or other",
             "date": "08.02.2023 15:00"
         }
+
+
+COLLECTION_MODELS = {
+    "birthdays": Birthday,
+    "lessons": Lesson,
+    "playlists": Playlist,
+    "schedule": Schedule,
+    "teachers": Teacher,
+    "week": Week,
+    "cron": Cron,
+    "admins": Admin,
+    "timetable": Timetable
+}
+
+
+COLLECTION_UPDATES = {
+    "birthdays": BirthdayUpdate,
+    "lessons": LessonUpdate,
+    "playlists": PlaylistUpdate,
+    "schedule": ScheduleUpdate,
+    "teachers": TeacherUpdate,
+    "week": WeekUpdate,
+    "cron": CronUpdate
+}
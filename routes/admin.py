@@ -1,17 +1,22 @@
+import avatars
+import cron_runner
 import db
-from fastapi import APIRouter, Depends, Response, status, HTTPException, Body
-from config import JWT_ACCESS_SECRET_KEY
+import cache
+import tenancy
+import versions
+from fastapi import APIRouter, Depends, Request, Response, status, HTTPException, Body
+from fastapi.responses import RedirectResponse
+from config import AVATAR_TTL, AVATAR_DEFAULT_URL
 from models import BulkDelete
-from security import decode_jwt, get_token, is_super
+from security import current_principal, is_super, get_admin
 from utils import get_photo
 
 router = APIRouter(tags=["admin"], prefix="/admins")
 
 
 @router.get("/profile")
-async def profile(token=Depends(get_token)):
-    payload = decode_jwt(token, JWT_ACCESS_SECRET_KEY)
-    pic = get_photo(int(payload["sub"]))
+async def profile(request: Request, payload: dict = Depends(current_principal)):
+    pic = get_photo(request, int(payload["sub"]))
     return {
         "user_id": payload["sub"],
         "username": payload["username"],
@@ -21,14 +26,44 @@ async def profile(token=Depends(get_token)):
 
 @router.get("/has-rights/{user_id}")
 async def check_rights(user_id):
-    if db.admins.find_one({"user_id": int(user_id)}, {"_id": 0, "username": 0}) is not None:
+    if await get_admin(int(user_id)) is not None:
         return {"result": True}
     return {"result": False}
 
 
+@router.get("/indexes", response_description="Index build results and query plans for hot queries")
+async def indexes(auth=Depends(is_super)):
+    return {
+        "indexes": db.index_results.get(tenancy.get_tenant(), {}),
+        "plans": await db.explain_hot_queries()
+    }
+
+
+@router.get("/cron", response_description="Cron job runner metrics")
+async def cron_stats(auth=Depends(is_super)):
+    return {name: job_stats.as_dict() for name, job_stats in cron_runner.tenant_stats().items()}
+
+
+@router.get("/{user_id}/avatar", name="avatar", response_description="Admin avatar image")
+async def avatar(user_id: int, request: Request):
+    if await get_admin(user_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Admin with ID {user_id} not found")
+
+    photo = await avatars.get_avatar(user_id)
+    if photo.content is None:
+        return RedirectResponse(AVATAR_DEFAULT_URL)
+
+    etag = f'"{photo.file_unique_id}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={AVATAR_TTL}"}
+    if versions.matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=photo.content, media_type="image/jpeg", headers=headers)
+
+
 @router.delete("/{_id}", response_description="Delete manager")
 async def delete_manager(_id: str, response: Response, auth=Depends(is_super)):
-    delete_result = db.admins.delete_one({"_id": _id, "role": "manager"})
+    delete_result = await db.admins.delete_one({"_id": _id, "role": "manager"})
+    cache.notify("admins", deleted=[_id])
 
     if delete_result.deleted_count == 1:
         response.status_code = status.HTTP_204_NO_CONTENT
@@ -39,9 +74,10 @@ async def delete_manager(_id: str, response: Response, auth=Depends(is_super)):
 
 @router.post("/bulk-delete", response_description="Delete many managers")
 async def delete_many_managers(response: Response, bulk_delete: BulkDelete = Body(...), auth=Depends(is_super)):
-    delete_result = db.admins.delete_many({"_id": {
+    delete_result = await db.admins.delete_many({"_id": {
         "$in": bulk_delete.ids
     }, "role": "manager"})
+    cache.notify("admins", deleted=bulk_delete.ids)
     if delete_result.deleted_count >= 1:
         response.status_code = status.HTTP_204_NO_CONTENT
         return response
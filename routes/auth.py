@@ -1,34 +1,50 @@
-from datetime import datetime
+import asyncio
+from datetime import datetime, timedelta
 
+import httpx
+import avatars
 import db
-from fastapi import APIRouter, status, Body, BackgroundTasks, HTTPException
+import cache
+from fastapi import APIRouter, status, Body, BackgroundTasks, HTTPException, Request
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from config import LOGIN_ATTEMPT_TTL
 from models import Login, LoginAttempt, Admin
 from security import create_access_token, JwtPayload
+from telegram import TelegramError
 from utils import create_user, send_otp, send_message
 
 router = APIRouter(tags=["auth"], prefix="/auth")
 
 
+def attempt_document(attempt: LoginAttempt) -> dict:
+    document = jsonable_encoder(attempt)
+    document["attempt_date"] = datetime.utcnow()
+    return document
+
+
+async def store_message_id(attempt_id: str, message: asyncio.Future):
+    try:
+        result = await message
+    except (TelegramError, httpx.HTTPError, ValueError):
+        return
+    await db.login_attempts.update_one({"_id": attempt_id}, {"$set": {"message_id": result["message_id"]}})
+
+
+def attempt_window() -> dict:
+    return {"$gte": datetime.utcnow() - timedelta(seconds=LOGIN_ATTEMPT_TTL)}
+
+
 @router.post("/login",
              response_description="Login user",
-             status_code=status.HTTP_200_OK,
-             response_class=JSONResponse)
-async def login(background_tasks: BackgroundTasks, login_body: Login = Body(...)):
-    if (admin := db.admins.find_one({"username": login_body.username})) is not None:
-        db.login_attempts.delete_many({"user_id": admin["user_id"]})
+             status_code=status.HTTP_200_OK)
+async def login(login_body: Login = Body(...)):
+    if (admin := await db.admins.find_one({"username": login_body.username})) is not None:
         login_attempt = LoginAttempt(
             user_id=admin["user_id"],
             username=admin["username"]
         )
-        background_tasks.add_task(
-            send_otp,
-            admin["user_id"],
-            login_attempt.otp
-        )
-        login_attempt = jsonable_encoder(login_attempt)
-        new_attempt = db.login_attempts.insert_one(login_attempt)
+        send_otp(admin["user_id"], login_attempt.otp)
+        new_attempt = await db.login_attempts.insert_one(attempt_document(login_attempt))
         return {"accepted": True, "user_id": admin["user_id"], "attempt_id": new_attempt.inserted_id}
     return {"accepted": False}
 
@@ -36,12 +52,17 @@ async def login(background_tasks: BackgroundTasks, login_body: Login = Body(...)
 @router.post("/check-otp",
              response_description="Check OTP",
              status_code=status.HTTP_200_OK)
-async def check_otp(background_tasks: BackgroundTasks,
+async def check_otp(request: Request, background_tasks: BackgroundTasks,
                     login_attempt: LoginAttempt = Body(...)):
-    attempt = db.login_attempts.find_one({"_id": login_attempt.id})
-    if attempt is not None and attempt['otp'] == login_attempt.otp:
-        background_tasks.add_task(db.login_attempts.delete_one, {"_id": login_attempt.id})
-        user = create_user(login_attempt.user_id, login_attempt.username)
+    attempt = await db.login_attempts.find_one_and_delete({
+        "_id": login_attempt.id,
+        "user_id": login_attempt.user_id,
+        "username": login_attempt.username,
+        "otp": login_attempt.otp,
+        "attempt_date": attempt_window()})
+    if attempt is not None:
+        background_tasks.add_task(avatars.get_avatar, login_attempt.user_id)
+        user = create_user(request, login_attempt.user_id, login_attempt.username)
         payload = JwtPayload(
             sub=str(login_attempt.user_id),
             username=login_attempt.username
@@ -53,8 +74,9 @@ async def check_otp(background_tasks: BackgroundTasks,
 
 
 @router.post('/cml')
-async def create_magic_link(la: LoginAttempt = Body(...)):
-    db.login_attempts.delete_many({"user_id": la.user_id})
+async def create_magic_link(background_tasks: BackgroundTasks, la: LoginAttempt = Body(...)):
+    attempt = attempt_document(la)
+    await db.login_attempts.insert_one(attempt)
     endpoint = "https://ki2helper.pp.ua/magic-login"
     message = send_message(la.user_id,
                            "Для авторизації в панель "
@@ -62,56 +84,42 @@ async def create_magic_link(la: LoginAttempt = Body(...)):
                            f"{endpoint}?uid={la.user_id}&um={la.username}&otp={la.otp}&hash_={la.id}",
                            protect_content=True,
                            disable_web_page_preview=True)
-    la.message_id = message.message_id
-    la = jsonable_encoder(la)
-    db.login_attempts.insert_one(la)
+    background_tasks.add_task(store_message_id, attempt["_id"], message)
 
 
 @router.post("/magic-login",
              response_description="Magic login",
              status_code=status.HTTP_200_OK)
-async def magic_login(background_tasks: BackgroundTasks, login_attempt: LoginAttempt = Body(...)):
-    now = datetime.utcnow()
-    attempt = db.login_attempts.find_one({
+async def magic_login(request: Request, background_tasks: BackgroundTasks, login_attempt: LoginAttempt = Body(...)):
+    attempt = await db.login_attempts.find_one_and_delete({
         "_id": login_attempt.id,
         "user_id": int(login_attempt.user_id),
         "username": login_attempt.username,
         "otp": int(login_attempt.otp),
-        "is_magic": bool(login_attempt.is_magic)})
+        "is_magic": bool(login_attempt.is_magic),
+        "attempt_date": attempt_window()})
     if not attempt:
         return {"success": False}
 
-    background_tasks.add_task(
-        db.login_attempts.delete_one,
-        {"_id": login_attempt.id}
-    )
-    attempt_date = datetime.fromisoformat(attempt['attempt_date'])
-    duration = now - attempt_date
-    diff = divmod(duration.total_seconds(), 60)[0]
-    user = create_user(login_attempt.user_id, login_attempt.username)
+    background_tasks.add_task(avatars.get_avatar, login_attempt.user_id)
+    user = create_user(request, login_attempt.user_id, login_attempt.username)
     payload = JwtPayload(
         sub=str(login_attempt.user_id),
         username=login_attempt.username
     )
     token = create_access_token(payload)
-    if diff <= 5:
-        return {"success": True, "user": user, "token": token}
-    return {"success": False}
+    return {"success": True, "user": user, "token": token}
 
 
 @router.post("/register",
              response_description="Register admin",
              status_code=status.HTTP_201_CREATED)
 async def register(admin: Admin = Body(...)):
-    if db.admins.find_one({"user_id": admin.user_id}):
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="user_id")
-
-    if db.admins.find_one({"username": admin.username}):
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="username")
+    if (existing := await db.admins.find_one({"$or": [{"user_id": admin.user_id}, {"username": admin.username}]})):
+        detail = "user_id" if existing["user_id"] == admin.user_id else "username"
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
 
     admin = jsonable_encoder(admin)
-    new_admin = db.admins.insert_one(admin)
-    created_admin = db.admins.find_one(
-        {"_id": new_admin.inserted_id}
-    )
-    return created_admin
+    await db.admins.insert_one(admin)
+    cache.notify("admins", upserted=[admin])
+    return admin
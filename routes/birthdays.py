@@ -0,0 +1,12 @@
+import pytz
+from datetime import datetime
+from fastapi import APIRouter, Query
+from birthday_index import index
+
+router = APIRouter(tags=["birthdays"], prefix="/birthdays")
+
+
+@router.get("/upcoming", response_description="List birthdays in the next N days")
+async def upcoming_birthdays(days: int = Query(7, ge=0, le=366)):
+    today = datetime.now(tz=pytz.timezone('Europe/Kiev')).date()
+    return await index.upcoming(today, days)
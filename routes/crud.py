@@ -1,9 +1,19 @@
 import db
-from fastapi import APIRouter, Body, Response, HTTPException, status, Depends
+import cache
+import metrics
+import versions
+from fastapi import APIRouter, Body, Request, Response, HTTPException, status, Depends, Query
 from fastapi.encoders import jsonable_encoder
-from typing import Union, Literal, List
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from typing import Union, Literal, Optional
+from pydantic import BaseModel, ValidationError
+from pydantic.error_wrappers import ErrorWrapper
+from pymongo import InsertOne, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 from security import authorized
-from models import EitherModel, BulkDelete, Admin, Timetable
+from responses import FastJSONResponse, dumps
+from models import BulkDelete, BulkWrite, COLLECTION_MODELS, COLLECTION_UPDATES
 
 router = APIRouter(tags=["crud"], prefix="/crud")
 
@@ -18,44 +28,142 @@ Collection = Literal[
 ]
 
 ExtendedCollection = Union[Collection, Literal["admins", "timetable"]]
-ExtendedEitherModel = Union[EitherModel, Admin, Timetable]
 
 
-@router.post("/{collection}/",
-             response_description="Create a new item", response_model=EitherModel,
-             status_code=status.HTTP_201_CREATED)
-async def create_item(collection: Collection, item: EitherModel = Body(...), auth=Depends(authorized)):
-    item = jsonable_encoder(item)
-    new_item = db.db[collection].insert_one(item)
-    created_item = db.db[collection].find_one(
-        {"_id": new_item.inserted_id}
-    )
-    return created_item
-
+def parse_item(collection: str, item: dict, models: dict = COLLECTION_MODELS) -> BaseModel:
+    try:
+        with metrics.timed("validation", collection):
+            return models[collection].parse_obj(item)
+    except ValidationError as e:
+        raise RequestValidationError([ErrorWrapper(e, ("body",))])
 
-@router.get("/{collection}/", response_description="List all items", response_model=List[ExtendedEitherModel])
-async def list_items(collection: ExtendedCollection):
-    items = list(db.db[collection].find())
-    return items
 
-
-@router.get("/{collection}/{_id}/", response_description="Get a single item by id", response_model=ExtendedEitherModel)
-async def find_item(collection: ExtendedCollection, _id: str):
-    if (item := db.db[collection].find_one({"_id": _id})) is not None:
-        return item
+@router.post("/{collection}/",
+             response_description="Create a new item",
+             status_code=status.HTTP_201_CREATED)
+async def create_item(collection: Collection, item: dict = Body(...), auth=Depends(authorized)):
+    item = jsonable_encoder(parse_item(collection, item))
+    await db.db[collection].insert_one(item)
+    cache.notify(collection, upserted=[item])
+    return item
+
+
+@router.post("/{collection}/bulk/", response_description="Create, update and upsert many items")
+async def bulk_write(collection: Collection, bulk: BulkWrite = Body(...), auth=Depends(authorized)):
+    results, requests, upserted, updates = [], [], [], []
+    for op, items in (("create", bulk.create), ("update", bulk.update), ("upsert", bulk.upsert)):
+        for index, item in enumerate(items):
+            result = {"op": op, "index": index}
+            results.append(result)
+            try:
+                if op == "update":
+                    result["_id"] = item.id
+                    update = COLLECTION_UPDATES[collection].parse_obj(item.update)
+                    updates.append((item.id, jsonable_encoder(update, exclude_none=True), result))
+                    continue
+                document = jsonable_encoder(COLLECTION_MODELS[collection].parse_obj(item))
+                result["_id"] = document["_id"]
+                if op == "create":
+                    request = InsertOne(document)
+                else:
+                    request = ReplaceOne({"_id": document["_id"]}, document, upsert=True)
+                upserted.append((len(requests), document))
+            except ValidationError as e:
+                result.update(ok=False, error=e.errors())
+                continue
+            result["ok"] = True
+            requests.append((request, result))
+
+    updated = False
+    if updates:
+        existing = {item["_id"] async for item in db.db[collection].find(
+            {"_id": {"$in": [_id for _id, _, _ in updates]}}, {"_id": 1})}
+        for _id, update, result in updates:
+            if _id not in existing:
+                result.update(ok=False, error=f"Item with ID {_id} not found")
+                continue
+            result["ok"] = True
+            if update:
+                requests.append((UpdateOne({"_id": _id}, {"$set": update}), result))
+                updated = True
+
+    write_errors = {}
+    if requests:
+        try:
+            await db.db[collection].bulk_write([request for request, _ in requests], ordered=False)
+        except BulkWriteError as e:
+            write_errors = {error["index"]: error for error in e.details["writeErrors"]}
+        for index, (_, result) in enumerate(requests):
+            if (error := write_errors.get(index)) is not None:
+                result.update(ok=False, error=error["errmsg"])
+        if updated:
+            cache.notify(collection)
+        else:
+            cache.notify(collection, upserted=[document for index, document in upserted if index not in write_errors])
+
+    return {
+        "ok": all(result["ok"] for result in results),
+        "results": results
+    }
+
+
+async def ndjson(cursor):
+    async for item in cursor:
+        yield dumps(jsonable_encoder(item)) + b"\n"
+
+
+@router.get("/{collection}/", response_description="List all items")
+async def list_items(collection: ExtendedCollection, request: Request,
+                     limit: Optional[int] = Query(None, ge=1, le=1000),
+                     after: Optional[str] = Query(None, description="Return items with _id greater than this one"),
+                     fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+                     stream: bool = Query(False, description="Stream items as NDJSON")):
+    tag = versions.etag((collection,), limit, after, fields, stream)
+    if (not_modified := versions.not_modified(request, tag)) is not None:
+        return not_modified
+
+    query = {"_id": {"$gt": after}} if after is not None else {}
+    projection = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    cursor = db.db[collection].find(query, projection)
+    if limit is not None or after is not None:
+        cursor = cursor.sort("_id")
+    if limit is not None:
+        cursor = cursor.limit(limit)
+
+    if stream:
+        return StreamingResponse(ndjson(cursor), media_type="application/x-ndjson", headers=versions.headers(tag))
+
+    items = await cursor.to_list(length=None)
+    headers = versions.headers(tag)
+    if limit is not None and len(items) == limit:
+        headers["X-Next-After"] = str(items[-1]["_id"])
+    return FastJSONResponse(jsonable_encoder(items), headers=headers)
+
+
+@router.get("/{collection}/{_id}/", response_description="Get a single item by id")
+async def find_item(collection: ExtendedCollection, _id: str, request: Request):
+    tag = versions.etag((collection,), _id)
+    if (not_modified := versions.not_modified(request, tag)) is not None:
+        return not_modified
+
+    if (item := await db.db[collection].find_one({"_id": _id})) is not None:
+        return FastJSONResponse(jsonable_encoder(item), headers=versions.headers(tag))
 
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Item with ID {_id} not found")
 
 
 @router.put("/{collection}/{_id}/", response_description="Update an item")
-async def update_item(collection: Collection, _id: str, update=Body(...), auth=Depends(authorized)):
-    update_result = db.db[collection].update_one(
-        {"_id": _id}, {"$set": jsonable_encoder(update)}
-    )
-    if update_result.modified_count == 0:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Item with ID {_id} not found")
-
-    if (existing_item := db.db[collection].find_one({"_id": _id})) is not None:
+async def update_item(collection: Collection, _id: str, update: dict = Body(...), auth=Depends(authorized)):
+    update = jsonable_encoder(parse_item(collection, update, COLLECTION_UPDATES), exclude_none=True)
+    if update:
+        existing_item = await db.db[collection].find_one_and_update(
+            {"_id": _id}, {"$set": update}, return_document=ReturnDocument.AFTER
+        )
+    else:
+        existing_item = await db.db[collection].find_one({"_id": _id})
+
+    if existing_item is not None:
+        cache.notify(collection, upserted=[existing_item])
         return existing_item
 
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Item with ID {_id} not found")
@@ -63,7 +171,8 @@ async def update_item(collection: Collection, _id: str, update=Body(...), auth=D
 
 @router.delete("/{collection}/{_id}/", response_description="Delete an item")
 async def delete_item(collection: Collection, _id: str, response: Response, auth=Depends(authorized)):
-    delete_result = db.db[collection].delete_one({"_id": _id})
+    delete_result = await db.db[collection].delete_one({"_id": _id})
+    cache.notify(collection, deleted=[_id])
 
     if delete_result.deleted_count == 1:
         response.status_code = status.HTTP_204_NO_CONTENT
@@ -75,9 +184,10 @@ async def delete_item(collection: Collection, _id: str, response: Response, auth
 @router.post("/{collection}/bulk-delete/", response_description="Delete many items")
 async def delete_many_items(collection: Collection, response: Response, bulk: BulkDelete = Body(...),
                             auth=Depends(authorized)):
-    delete_result = db.db[collection].delete_many({"_id": {
+    delete_result = await db.db[collection].delete_many({"_id": {
         "$in": bulk.ids
     }})
+    cache.notify(collection, deleted=bulk.ids)
     if delete_result.deleted_count >= 1:
         response.status_code = status.HTTP_204_NO_CONTENT
         return response
@@ -1,30 +1,36 @@
 import db
+import cache
+import versions
 from fastapi.encoders import jsonable_encoder
-from fastapi import APIRouter, Body, status, Response, HTTPException
+from fastapi import APIRouter, Body, status, Request, Response, HTTPException
+from responses import FastJSONResponse
 from models import ScheduledEvent
 
 router = APIRouter(tags=["events"], prefix="/events")
 
 
 @router.get("/", response_description="List events")
-async def events_all():
-    events = list(db.events.find())
-    return events
+async def events_all(request: Request):
+    tag = versions.etag(("events",))
+    if (not_modified := versions.not_modified(request, tag)) is not None:
+        return not_modified
+
+    events = await db.events.find().to_list(length=None)
+    return FastJSONResponse(jsonable_encoder(events), headers=versions.headers(tag))
 
 
 @router.post("/", response_description="Add event", status_code=status.HTTP_201_CREATED)
 async def new_event(item: ScheduledEvent = Body(...)):
     item = jsonable_encoder(item)
-    new_item = db.events.insert_one(item)
-    created_item = db.events.find_one(
-        {"_id": new_item.inserted_id}
-    )
-    return created_item
+    await db.events.insert_one(item)
+    cache.notify("events", upserted=[item])
+    return item
 
 
 @router.delete("/{_id}", response_description="Delete event", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_event(_id: str, response: Response):
-    delete_result = db.events.delete_one({"_id": _id})
+    delete_result = await db.events.delete_one({"_id": _id})
+    cache.notify("events", deleted=[_id])
 
     if delete_result.deleted_count == 1:
         response.status_code = status.HTTP_204_NO_CONTENT
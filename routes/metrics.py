@@ -0,0 +1,15 @@
+import cache
+import metrics
+from fastapi import APIRouter, Response
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_description="Latency histograms in Prometheus text format")
+async def prometheus_metrics():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@router.get("/cache-stats", response_description="Hit/miss counters of the TTL caches")
+async def cache_stats():
+    return {name: ttl_cache.stats() for name, ttl_cache in cache.caches.items()}
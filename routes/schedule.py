@@ -1,42 +1,77 @@
 import pytz
 import db
+import versions
 from datetime import datetime
-from fastapi import APIRouter
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from typing import List, Optional
+from intervals import lesson_index
 from models import Schedule
+from snapshot import snapshot
+from week_type import current_week_type
 
 router = APIRouter(tags=["schedule"], prefix="/schedule")
 
 
+async def resolve_week_type(week_type: Optional[str] = None) -> str:
+    if week_type is None and (week_type := await current_week_type()) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Week type is not set")
+    return week_type
+
+
+async def snapshot_response(request: Request, week_type: Optional[str] = None,
+                            day_number: Optional[int] = None) -> Response:
+    data = await snapshot.view(week_type, day_number)
+    tag = versions.etag((), snapshot.version, week_type, day_number)
+    if (response := versions.not_modified(request, tag)) is not None:
+        return response
+    return Response(content=data, media_type="application/json", headers=versions.headers(tag))
+
+
 @router.get("/", response_description="List schedule")
-async def schedule_all():
-    schedule = list(db.schedule.find().sort("number").sort("day_number"))
-    schedule_to_print = list()
-    for item in schedule:
-        item_for_print = item
-        item_for_print['lesson'] = item['lesson']['short_name'] + ' ' + item['lesson']['type']
-        schedule_to_print.append(item_for_print)
-    return schedule_to_print
+async def schedule_all(request: Request):
+    return await snapshot_response(request)
 
 
 @router.get("/count", response_description="Count documents", response_model=int)
 async def count_docs():
-    return db.schedule.count({})
+    return await db.schedule.count_documents({})
+
+
+@router.get("/cache-stats", response_description="Schedule snapshot hit/miss counters")
+async def cache_stats():
+    return snapshot.stats()
+
+
+@router.get("/week-type", response_description="Current week type")
+async def week_type_current(week_type: str = Depends(resolve_week_type)):
+    return {"type": week_type}
+
+
+@router.get("/week", response_description="List schedule by current week type", response_model=List[Schedule])
+async def schedule_current_week(request: Request, week_type: str = Depends(resolve_week_type)):
+    return await snapshot_response(request, week_type)
+
+
+@router.get("/today", response_description="List schedule by today and current week type",
+            response_model=List[Schedule])
+async def schedule_today(request: Request, week_type: str = Depends(resolve_week_type)):
+    now = datetime.now(tz=pytz.timezone('Europe/Kiev'))
+    return await snapshot_response(request, week_type, now.weekday() + 1)
+
+
+@router.get("/now", response_description="Current and next lesson")
+async def schedule_now(week_type: str = Depends(resolve_week_type)):
+    now = datetime.now(tz=pytz.timezone('Europe/Kiev'))
+    return await lesson_index.now(week_type, now.weekday() + 1, now.hour * 60 + now.minute)
 
 
 @router.get("/filtered/{week_type}", response_description="List schedule by week type", response_model=List[Schedule])
-async def schedule_by_week(week_type):
-    schedule = list(db.schedule.find({"$or": [{"week_type": week_type}, {"week_type": "-"}]})
-                    .sort("number")
-                    .sort("day_number"))
-    return schedule
+async def schedule_by_week(request: Request, week_type):
+    return await snapshot_response(request, week_type)
 
 
 @router.get("/filtered/today/{week_type}", response_description="List schedule by today and week type",
             response_model=List[Schedule])
-async def schedule_by_day(week_type):
+async def schedule_by_day(request: Request, week_type):
     now = datetime.now(tz=pytz.timezone('Europe/Kiev'))
-    schedule = list(db.schedule.find({"day_number": now.weekday() + 1,
-                                      "$or": [{"week_type": week_type}, {"week_type": "-"}]})
-                    .sort("number"))
-    return schedule
+    return await snapshot_response(request, week_type, now.weekday() + 1)
@@ -0,0 +1,135 @@
+import asyncio
+import heapq
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pytz
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+import cache
+import db
+import tenancy
+from config import EVENTS_CHAT_ID, EVENTS_GRACE
+from telegram import sender
+from tenancy import PerTenant
+
+TIMEZONE = pytz.timezone('Europe/Kiev')
+DATE_FORMATS = ("%d.%m.%Y %H:%M", "%d.%m.%Y %H:%M:%S", "%d.%m.%Y")
+MAX_SLEEP = 60
+
+
+def parse_date(value: str) -> Optional[float]:
+    for date_format in DATE_FORMATS:
+        try:
+            return TIMEZONE.localize(datetime.strptime(value.strip(), date_format)).timestamp()
+        except (ValueError, AttributeError):
+            continue
+    return None
+
+
+def format_event(event: dict) -> str:
+    return f"{event['name']}\n\n{event['description']}"
+
+
+class EventScheduler:
+    def __init__(self, chat_id=EVENTS_CHAT_ID, grace: float = EVENTS_GRACE, clock: Callable[[], float] = time.time,
+                 send: Optional[Callable] = None):
+        self.chat_id = chat_id
+        self.grace = grace
+        self.clock = clock
+        self.send = send or (lambda event: sender.send_message(self.chat_id, format_event(event)))
+        self._heap: List[Tuple[float, str]] = []
+        self._events: Dict[str, Tuple[float, dict]] = {}
+        self._changed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, event: dict):
+        self.remove(event["_id"])
+        if event.get("sent_at") is not None or (due := parse_date(event["date"])) is None:
+            return
+        self._events[event["_id"]] = (due, event)
+        heapq.heappush(self._heap, (due, event["_id"]))
+        self._wake()
+
+    def remove(self, _id: str):
+        if self._events.pop(_id, None) is not None:
+            self._wake()
+
+    def _wake(self):
+        if self._changed is not None:
+            self._changed.set()
+
+    def on_change(self, collection: str, upserted: Optional[List[dict]] = None,
+                  deleted: Optional[List[str]] = None):
+        if upserted is None and deleted is None:
+            self._events.clear()
+            self._heap.clear()
+            asyncio.create_task(self.load())
+            return
+        for _id in deleted or ():
+            self.remove(_id)
+        for event in upserted or ():
+            self.add(event)
+
+    async def load(self):
+        async for event in db.events.find({"sent_at": {"$exists": False}}):
+            self.add(event)
+
+    def next_due(self) -> Optional[float]:
+        while self._heap:
+            due, _id = self._heap[0]
+            if (entry := self._events.get(_id)) is not None and entry[0] == due:
+                return due
+            heapq.heappop(self._heap)
+        return None
+
+    async def _dispatch(self, event: dict, due: float):
+        now = self.clock()
+        claimed = await db.events.find_one_and_update(
+            {"_id": event["_id"], "sent_at": {"$exists": False}},
+            {"$set": {"sent_at": datetime.utcfromtimestamp(now), "skipped": now - due > self.grace}},
+            return_document=ReturnDocument.AFTER
+        )
+        if claimed is None:
+            return
+        cache.notify("events", upserted=[claimed])
+        if not claimed["skipped"]:
+            self.send(claimed)
+
+    async def run_due(self) -> Optional[float]:
+        while (due := self.next_due()) is not None and due <= self.clock():
+            _, _id = heapq.heappop(self._heap)
+            _, event = self._events.pop(_id)
+            try:
+                await self._dispatch(event, due)
+            except PyMongoError:
+                self.add(event)
+                return MAX_SLEEP
+        return None if due is None else due - self.clock()
+
+    async def run(self):
+        self._changed = asyncio.Event()
+        await self.load()
+        while True:
+            self._changed.clear()
+            delay = await self.run_due()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=min(delay or MAX_SLEEP, MAX_SLEEP))
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self.chat_id and self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+scheduler = PerTenant(lambda: EventScheduler(tenancy.settings()["chat_id"]), EventScheduler)
+cache.subscribe(("events",), scheduler.on_change)
@@ -1,3 +1,5 @@
+import hashlib
+import time
 from typing import Union
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
@@ -5,10 +7,18 @@ from pydantic import BaseModel
 from jose import jwt
 
 import db
-from config import JWT_ACCESS_SECRET_KEY, JWT_ALG
+import metrics
+from cache import TTLCache, MISSING, subscribe
+from config import JWT_ACCESS_SECRET_KEY, JWT_ALG, ADMIN_CACHE_TTL, ADMIN_CACHE_SIZE, TOKEN_CACHE_TTL, \
+    TOKEN_CACHE_SIZE
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+admin_cache = TTLCache("admins", ADMIN_CACHE_TTL, maxsize=ADMIN_CACHE_SIZE)
+subscribe(("admins",), lambda *args: admin_cache.invalidate())
+
+token_cache = TTLCache("tokens", TOKEN_CACHE_TTL, maxsize=TOKEN_CACHE_SIZE)
+
 
 class JwtPayload(BaseModel):
     sub: str
@@ -25,10 +35,30 @@ def create_access_token(payload: JwtPayload):
 
 
 def decode_jwt(token: str, secret_key: str) -> Union[dict, None]:
+    key = hashlib.sha256(f"{secret_key}:{token}".encode()).digest()
+    if (payload := token_cache.get(key)) is not MISSING:
+        return payload
     try:
-        return jwt.decode(token, secret_key, JWT_ALG)
+        with metrics.timed("jwt", "decode"):
+            payload = jwt.decode(token, secret_key, JWT_ALG)
     except:
         return None
+    ttl = token_cache.ttl
+    if "exp" in payload:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        token_cache.set(key, payload, ttl=ttl)
+    return payload
+
+
+async def get_admin(user_id: int) -> Union[dict, None]:
+    if (admin := admin_cache.get(user_id)) is not MISSING:
+        return admin
+    generation = admin_cache.generation
+    admin = await db.admins.find_one({"user_id": user_id})
+    if generation == admin_cache.generation:
+        admin_cache.set(user_id, admin)
+    return admin
 
 
 def raise_401(detail: str = "Not authenticated"):
@@ -39,11 +69,15 @@ def raise_401(detail: str = "Not authenticated"):
     )
 
 
-async def authorized(token: str = Depends(oauth2_scheme)):
+async def current_principal(token: str = Depends(oauth2_scheme)) -> dict:
     user = decode_jwt(token, JWT_ACCESS_SECRET_KEY)
     if not user:
         raise_401()
-    admin = db.admins.find_one({"user_id": int(user["sub"])})
+    return user
+
+
+async def authorized(user: dict = Depends(current_principal)):
+    admin = await get_admin(int(user["sub"]))
     if not admin:
         raise_401()
     return True
@@ -53,11 +87,8 @@ async def get_token(token: str = Depends(oauth2_scheme)):
     return token
 
 
-async def is_super(token: str = Depends(oauth2_scheme)):
-    user = decode_jwt(token, JWT_ACCESS_SECRET_KEY)
-    if not user:
-        raise_401()
-    admin = db.admins.find_one({"user_id": int(user["sub"])})
+async def is_super(user: dict = Depends(current_principal)):
+    admin = await get_admin(int(user["sub"]))
     if not admin:
         raise_401()
     if admin["role"] != "super":
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+from pymongo.errors import PyMongoError
+
+import db
+from cache import subscribe
+from config import SCHEDULE_CACHE_TTL
+from models import Schedule
+from responses import dumps as encode
+from tenancy import PerTenant
+
+WEEK_TYPES = ("Чисельник", "Знаменник")
+DAY_NUMBERS = range(1, 8)
+
+ViewKey = Tuple[Optional[str], Optional[int]]
+ALL = ("*", None)
+
+
+def pipeline(match: Optional[dict] = None) -> list:
+    stages = [{"$match": match}] if match is not None else []
+    return stages + [
+        {"$addFields": {"_lesson_ref": {"$ifNull": ["$lesson_id", "$lesson._id"]}}},
+        {"$lookup": {"from": "lessons", "localField": "_lesson_ref", "foreignField": "_id", "as": "_lesson"}},
+        {"$addFields": {"lesson": {"$ifNull": [{"$arrayElemAt": ["$_lesson", 0]}, "$lesson"]}}},
+        {"$addFields": {"lesson_display": {"$concat": ["$lesson.short_name", " ", "$lesson.type"]}}},
+        {"$project": {"_lesson_ref": 0, "_lesson": 0}}
+    ]
+
+
+async def materialize(match: Optional[dict] = None):
+    if match is None:
+        stage = {"$out": db.schedule_view.name}
+    else:
+        stage = {"$merge": {"into": db.schedule_view.name, "on": "_id",
+                            "whenMatched": "replace", "whenNotMatched": "insert"}}
+    await db.schedule.aggregate(pipeline(match) + [stage]).to_list(length=None)
+
+
+def to_print(raw: dict) -> dict:
+    item = {key: value for key, value in raw.items() if key != "lesson_display"}
+    item['lesson'] = raw.get('lesson_display')
+    return item
+
+
+class ScheduleSnapshot:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._raw: Dict[str, dict] = {}
+        self._items: Dict[str, dict] = {}
+        self._views: Dict[ViewKey, bytes] = {}
+        self._loaded_at: Optional[float] = None
+        self._materialized = False
+        self._generation = 0
+        self.version = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._tasks = set()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    async def _settle(self):
+        # A write queues its refresh before it returns; reads wait for it so
+        # the next request sees the write.
+        while self._tasks:
+            await asyncio.wait(set(self._tasks))
+
+    async def view(self, week_type: Optional[str] = None, day_number: Optional[int] = None) -> bytes:
+        await self._settle()
+        if not self.loaded:
+            await self._load()
+        key = ALL if week_type is None else (week_type, day_number)
+        if (data := self._views.get(key)) is not None:
+            self.hits += 1
+            return data
+        self.misses += 1
+        data = self._build(key)
+        if key == ALL or week_type in WEEK_TYPES:
+            self._views[key] = data
+        return data
+
+    async def _load(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._loaded_at is not None and not self.loaded:
+                self._materialized = False
+            while not self.loaded:
+                generation = self._generation
+                if not self._materialized:
+                    await materialize()
+                    self._materialized = True
+                raw = await db.schedule_view.find().to_list(length=None)
+                if generation != self._generation:
+                    continue
+                self._raw = {item["_id"]: item for item in raw}
+                self._items = {_id: self._validate(item) for _id, item in self._raw.items()}
+                self._views = {}
+                for week_type in WEEK_TYPES:
+                    self._views[(week_type, None)] = self._build((week_type, None))
+                    for day_number in DAY_NUMBERS:
+                        self._views[(week_type, day_number)] = self._build((week_type, day_number))
+                self._views[ALL] = self._build(ALL)
+                self._loaded_at = time.monotonic()
+                self.version += 1
+
+    @staticmethod
+    def _validate(raw: dict) -> dict:
+        return json.loads(Schedule.parse_obj(raw).json(by_alias=True))
+
+    async def entries(self, week_type: str, day_number: int) -> List[dict]:
+        await self._settle()
+        if not self.loaded:
+            await self._load()
+        return sorted((item for item in self._items.values()
+                       if item["week_type"] in (week_type, "-") and item["day_number"] == day_number),
+                      key=lambda i: i["number"])
+
+    def _build(self, key: ViewKey) -> bytes:
+        week_type, day_number = key
+        if key == ALL:
+            items = sorted(self._raw.values(), key=lambda i: (i["day_number"], i["number"]))
+            return encode([to_print(item) for item in items])
+        items = [item for item in self._items.values()
+                 if item["week_type"] in (week_type, "-")
+                 and (day_number is None or item["day_number"] == day_number)]
+        items.sort(key=lambda i: (i["day_number"], i["number"]))
+        return encode(items)
+
+    def _touch(self, item: dict):
+        for key in list(self._views):
+            week_type, day_number = key
+            if key == ALL or (item["week_type"] in (week_type, "-")
+                              and (day_number is None or item["day_number"] == day_number)):
+                del self._views[key]
+
+    def _patch(self, upserted: List[dict] = (), deleted: List[str] = ()):
+        if self._loaded_at is None:
+            return
+        self.version += 1
+        for _id in deleted:
+            if (item := self._items.pop(_id, None)) is not None:
+                del self._raw[_id]
+                self._touch(item)
+        for raw in upserted:
+            if (item := self._items.get(raw["_id"])) is not None:
+                self._touch(item)
+            item = self._items[raw["_id"]] = self._validate(raw)
+            self._raw[raw["_id"]] = raw
+            self._touch(item)
+
+    async def _refresh(self, collection: str, upserted: Optional[List[dict]], deleted: Optional[List[str]]):
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            try:
+                await self._refresh_view(collection, upserted, deleted)
+            except PyMongoError:
+                self._generation += 1
+                self._loaded_at = None
+                self._materialized = False
+
+    async def _refresh_view(self, collection: str, upserted: Optional[List[dict]], deleted: Optional[List[str]]):
+        if upserted is None and deleted is None:
+            await materialize()
+            self._generation += 1
+            self._loaded_at = None
+            return
+        ids = [item["_id"] for item in upserted or ()]
+        if collection == "schedule":
+            if deleted:
+                await db.schedule_view.delete_many({"_id": {"$in": deleted}})
+            match = {"_id": {"$in": ids}}
+        else:
+            ids += deleted or []
+            deleted = []
+            match = {"$or": [{"lesson_id": {"$in": ids}}, {"lesson._id": {"$in": ids}}]}
+        if ids:
+            await materialize(match)
+        self._generation += 1
+        self._patch(await db.schedule_view.find(match).to_list(length=None) if ids else [], deleted or [])
+
+    def apply(self, collection: str, upserted: Optional[List[dict]] = None, deleted: Optional[List[str]] = None):
+        self._generation += 1
+        task = asyncio.create_task(self._refresh(collection, upserted, deleted))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "views": len(self._views),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "ttl": self.ttl
+        }
+
+
+snapshot = PerTenant(lambda: ScheduleSnapshot(SCHEDULE_CACHE_TTL), ScheduleSnapshot)
+subscribe(("schedule", "lessons"), snapshot.apply)
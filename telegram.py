@@ -0,0 +1,219 @@
+import asyncio
+import itertools
+import random
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Set
+
+import httpx
+
+import metrics
+from config import BOT_TOKEN, TELEGRAM_API_URL, TELEGRAM_WORKERS, TELEGRAM_GLOBAL_RATE, TELEGRAM_CHAT_RATE, \
+    TELEGRAM_GROUP_RATE, TELEGRAM_MAX_RETRIES
+
+
+class TelegramError(Exception):
+    def __init__(self, status_code: int, description: str):
+        super().__init__(f"{status_code}: {description}")
+        self.status_code = status_code
+        self.description = description
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.updated = clock()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    @property
+    def idle(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+    def wait(self) -> float:
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def take(self) -> float:
+        if (wait := self.wait()) == 0:
+            self.tokens -= 1
+        return wait
+
+    async def acquire(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class OutboundMessage:
+    __slots__ = ("method", "chat_id", "params", "future", "attempts")
+
+    def __init__(self, method: str, chat_id, params: dict, future: asyncio.Future):
+        self.method = method
+        self.chat_id = chat_id
+        self.params = params
+        self.future = future
+        self.attempts = 0
+
+
+def _consume(future: asyncio.Future):
+    if not future.cancelled():
+        future.exception()
+
+
+class TelegramSender:
+    def __init__(self, workers: int = TELEGRAM_WORKERS, global_rate: float = TELEGRAM_GLOBAL_RATE,
+                 chat_rate: float = TELEGRAM_CHAT_RATE, group_rate: float = TELEGRAM_GROUP_RATE,
+                 max_retries: int = TELEGRAM_MAX_RETRIES, base_url: str = TELEGRAM_API_URL, token: str = BOT_TOKEN):
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self.base_url = base_url
+        self.token = token
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_buckets: Dict[str, TokenBucket] = {}
+        self.queue: Optional[asyncio.PriorityQueue] = None
+        self.http: Optional[httpx.AsyncClient] = None
+        self._tasks = []
+        self._deferred: Set[OutboundMessage] = set()
+        self._held: Dict[str, Deque[OutboundMessage]] = {}
+        self._order = itertools.count()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self):
+        if self.running:
+            return
+        self.queue = asyncio.PriorityQueue()
+        self.http = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(10.0),
+            limits=httpx.Limits(max_connections=self.workers, max_keepalive_connections=self.workers)
+        )
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 10.0):
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.http.aclose()
+
+    async def _drain(self):
+        while True:
+            await self.queue.join()
+            if not self._deferred:
+                return
+            await asyncio.sleep(0.1)
+
+    def call(self, method: str, chat_id, **params) -> asyncio.Future:
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume)
+        self._put(OutboundMessage(method, chat_id, params, future))
+        return future
+
+    def send_message(self, chat_id, text: str, **params) -> asyncio.Future:
+        return self.call("sendMessage", chat_id, text=text, **params)
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        key = str(chat_id)
+        if (bucket := self.chat_buckets.get(key)) is None:
+            if len(self.chat_buckets) > 10000:
+                self.chat_buckets = {k: b for k, b in self.chat_buckets.items() if not b.idle}
+            rate = self.group_rate if key.startswith(("-", "@")) else self.chat_rate
+            bucket = self.chat_buckets[key] = TokenBucket(rate, 1)
+        return bucket
+
+    def _put(self, message: OutboundMessage):
+        # Ordered by when the message became sendable, so a deferred message
+        # whose slot has come goes ahead of everything queued after that.
+        self.queue.put_nowait((time.monotonic(), next(self._order), message))
+
+    def _defer(self, message: OutboundMessage, delay: float):
+        self._deferred.add(message)
+        asyncio.get_running_loop().call_later(delay, self._requeue, message)
+
+    def _requeue(self, message: OutboundMessage):
+        self._deferred.discard(message)
+        self._put(message)
+
+    async def _worker(self):
+        while True:
+            *_, message = await self.queue.get()
+            try:
+                await self._deliver(message)
+            except Exception as e:
+                if not message.future.done():
+                    message.future.set_exception(e)
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, message: OutboundMessage):
+        # A chat that is over its limit must not hold a worker: its messages
+        # wait off the queue, in order, and only the first one holds a timer.
+        key = str(message.chat_id)
+        bucket = self._chat_bucket(key)
+        held = self._held.get(key)
+        if held is not None and held[0] is not message:
+            held.append(message)
+            return
+        if (delay := bucket.take()) > 0:
+            if held is None:
+                self._held[key] = deque([message])
+            self._defer(message, delay)
+            return
+        if held is not None:
+            held.popleft()
+            if held:
+                self._defer(held[0], bucket.wait())
+            else:
+                del self._held[key]
+        message.attempts += 1
+        await self.global_bucket.acquire()
+        retry_after = None
+        try:
+            with metrics.timed("telegram", message.method):
+                response = await self.http.post(f"/bot{self.token}/{message.method}",
+                                                json={"chat_id": message.chat_id, **message.params})
+            body = response.json()
+            if response.status_code == 200 and body.get("ok"):
+                message.future.set_result(body["result"])
+                return
+            error = TelegramError(response.status_code, body.get("description", ""))
+            if response.status_code == 429:
+                retry_after = body.get("parameters", {}).get("retry_after")
+            elif response.status_code < 500:
+                raise error
+        except (httpx.HTTPError, ValueError) as e:
+            error = e
+        if message.attempts > self.max_retries:
+            raise error
+        if retry_after is None:
+            retry_after = min(30.0, 0.5 * 2 ** (message.attempts - 1)) * (1 + random.random() / 2)
+        self._defer(message, retry_after)
+
+
+sender = TelegramSender()
@@ -0,0 +1,97 @@
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Generic, Optional, Type, TypeVar
+
+from config import CRON_CHAT_ID, DB_NAME, DEFAULT_TENANT, EVENTS_CHAT_ID, TENANTS as TENANTS_CONFIG
+
+T = TypeVar("T")
+
+TENANT_HEADER = b"x-tenant"
+TENANT_PREFIX = "/t/"
+
+TENANTS: Dict[str, dict] = json.loads(TENANTS_CONFIG) if TENANTS_CONFIG else {DEFAULT_TENANT: {}}
+for _tenant, _settings in TENANTS.items():
+    _settings.setdefault("db", DB_NAME if _tenant == DEFAULT_TENANT else _tenant)
+    _settings.setdefault("chat_id", EVENTS_CHAT_ID)
+    _settings.setdefault("cron_chat_id", CRON_CHAT_ID)
+
+if DEFAULT_TENANT not in TENANTS:
+    raise ValueError(f"DEFAULT_TENANT {DEFAULT_TENANT!r} is not configured in TENANTS ({', '.join(TENANTS)})")
+
+current_tenant: ContextVar[str] = ContextVar("tenant", default=DEFAULT_TENANT)
+
+
+def get_tenant() -> str:
+    return current_tenant.get()
+
+
+def settings(tenant: str = None) -> dict:
+    return TENANTS[tenant or get_tenant()]
+
+
+@contextmanager
+def use(tenant: str):
+    token = current_tenant.set(tenant)
+    try:
+        yield tenant
+    finally:
+        current_tenant.reset(token)
+
+
+def each():
+    for tenant in TENANTS:
+        with use(tenant):
+            yield tenant
+
+
+class PerTenant(Generic[T]):
+    def __init__(self, factory: Callable[[], T], cls: Optional[Type[T]] = None):
+        self._factory = factory
+        self._cls = cls or factory
+        self._instances: Dict[str, T] = {}
+
+    def current(self) -> T:
+        tenant = get_tenant()
+        if (instance := self._instances.get(tenant)) is None:
+            instance = self._instances[tenant] = self._factory()
+        return instance
+
+    def items(self):
+        return self._instances.items()
+
+    def __getattr__(self, name: str):
+        # Methods are looked up on the class, so subscribing one at import
+        # neither builds an instance nor binds it to whichever tenant is current.
+        if callable(getattr(self._cls, name, None)):
+            return lambda *args, **kwargs: getattr(self.current(), name)(*args, **kwargs)
+        return getattr(self.current(), name)
+
+
+class TenantMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+
+        tenant = dict(scope["headers"]).get(TENANT_HEADER, b"").decode("latin-1") or None
+        path = scope["path"]
+        if path.startswith(TENANT_PREFIX):
+            tenant, _, rest = path[len(TENANT_PREFIX):].partition("/")
+            prefix = TENANT_PREFIX + tenant
+            scope = {**scope, "path": "/" + rest, "root_path": scope.get("root_path", "") + prefix,
+                     "raw_path": (scope.get("raw_path") or path.encode())[len(prefix.encode()):] or b"/"}
+        tenant = tenant or DEFAULT_TENANT
+
+        if tenant not in TENANTS:
+            body = json.dumps({"detail": f"Tenant {tenant} not found"}).encode()
+            await send({"type": "http.response.start", "status": 404,
+                        "headers": [(b"content-type", b"application/json"),
+                                    (b"content-length", str(len(body)).encode())]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        with use(tenant):
+            await self.app(scope, receive, send)
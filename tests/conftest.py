@@ -0,0 +1,10 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("MONGO_CONNECTION", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test")
+os.environ.setdefault("JWT_ALG", "HS256")
+os.environ.setdefault("JWT_ACCESS_SECRET_KEY", "test-secret")
+os.environ.setdefault("BOT_TOKEN", "0:test")
@@ -0,0 +1,116 @@
+import asyncio
+
+import httpx
+import pytest
+
+import avatars
+from avatars import Avatar, AvatarCache
+from config import AVATAR_TTL
+
+
+class FakeTelegram:
+    def __init__(self):
+        self.photos = {}
+        self.failing = False
+        self.requests = []
+
+    def set_photo(self, user_id: int, file_unique_id: str, content: bytes):
+        self.photos[user_id] = (file_unique_id, content)
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        method = request.url.path.rsplit("/", 1)[-1]
+        self.requests.append(method)
+        if self.failing:
+            return httpx.Response(502, json={"ok": False, "description": "Bad Gateway"})
+        if method == "getUserProfilePhotos":
+            user_id = int(request.url.params["user_id"])
+            if user_id not in self.photos:
+                return httpx.Response(200, json={"ok": True, "result": {"total_count": 0, "photos": []}})
+            file_unique_id, _ = self.photos[user_id]
+            photo = {"file_id": f"file-{user_id}", "file_unique_id": file_unique_id}
+            return httpx.Response(200, json={"ok": True, "result": {"total_count": 1, "photos": [[photo]]}})
+        if method == "getFile":
+            user_id = int(request.url.params["file_id"].split("-")[1])
+            return httpx.Response(200, json={"ok": True, "result": {"file_path": f"photos/{user_id}.jpg"}})
+        user_id = int(method.split(".")[0])
+        return httpx.Response(200, content=self.photos[user_id][1])
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    telegram = FakeTelegram()
+    monkeypatch.setattr(avatars, "http", httpx.AsyncClient(base_url="https://api.telegram.test",
+                                                           transport=httpx.MockTransport(telegram)))
+    monkeypatch.setattr(avatars, "cache", AvatarCache(1024 * 1024))
+    monkeypatch.setattr(avatars, "store", None)
+    monkeypatch.setattr(avatars, "_refreshing", {})
+    return telegram
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(avatars.time, "time", lambda: now[0])
+    return now
+
+
+async def settle():
+    while avatars._refreshing:
+        await asyncio.gather(*avatars._refreshing.values())
+
+
+def test_user_without_photo_is_cached(telegram, clock):
+    async def scenario():
+        first = await avatars.get_avatar(1)
+        second = await avatars.get_avatar(1)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.content is None and first.file_unique_id is None
+    assert second is first
+    assert telegram.requests == ["getUserProfilePhotos"]
+
+
+def test_unchanged_photo_is_not_downloaded_again(telegram, clock):
+    telegram.set_photo(1, "unique-1", b"jpeg-1")
+    avatar = asyncio.run(avatars.get_avatar(1))
+    assert avatar.content == b"jpeg-1"
+    assert telegram.requests == ["getUserProfilePhotos", "getFile", "1.jpg"]
+
+    clock[0] += AVATAR_TTL + 1
+    telegram.requests.clear()
+    refreshed = asyncio.run(avatars.refresh(1, avatar))
+    assert refreshed.content == b"jpeg-1" and refreshed.fetched_at == clock[0]
+    assert telegram.requests == ["getUserProfilePhotos"]
+
+
+def test_stale_avatar_is_served_while_refreshed_in_background(telegram, clock):
+    telegram.set_photo(1, "unique-1", b"jpeg-1")
+    asyncio.run(avatars.get_avatar(1))
+    clock[0] += AVATAR_TTL + 1
+    telegram.set_photo(1, "unique-2", b"jpeg-2")
+
+    async def scenario():
+        served = await avatars.get_avatar(1)
+        await settle()
+        return served, await avatars.get_avatar(1)
+
+    served, refreshed = asyncio.run(scenario())
+    assert served.content == b"jpeg-1"
+    assert refreshed.content == b"jpeg-2" and not refreshed.stale
+
+
+def test_telegram_error_falls_back_to_known_avatar(telegram, clock):
+    telegram.set_photo(1, "unique-1", b"jpeg-1")
+    known = asyncio.run(avatars.get_avatar(1))
+    clock[0] += AVATAR_TTL + 1
+    telegram.failing = True
+
+    async def scenario():
+        served = await avatars.get_avatar(1)
+        await settle()
+        return served, await avatars.get_avatar(1)
+
+    served, after = asyncio.run(scenario())
+    assert served is known and after is known
+    assert asyncio.run(avatars.refresh(2)).content is None
@@ -0,0 +1,34 @@
+from datetime import date
+
+import pytest
+
+from birthday_index import days_until, ranges
+
+
+@pytest.mark.parametrize("start, days, expected", [
+    (date(2023, 1, 10), 0, [(10, 10)]),
+    (date(2023, 1, 10), 7, [(10, 17)]),
+    (date(2023, 12, 28), 7, [(363, 366), (1, 4)]),
+    (date(2023, 2, 28), 0, [(59, 59)]),
+    (date(2023, 3, 1), 0, [(60, 61)]),
+    (date(2023, 3, 1), 3, [(60, 64)]),
+    (date(2024, 2, 29), 0, [(60, 60)]),
+    (date(2024, 3, 1), 0, [(61, 61)]),
+    (date(2023, 5, 1), 365, [(1, 366)]),
+])
+def test_ranges(start, days, expected):
+    assert ranges(start, days) == expected
+
+
+@pytest.mark.parametrize("today, month, day, expected", [
+    (date(2023, 1, 10), 1, 10, 0),
+    (date(2023, 1, 10), 1, 12, 2),
+    (date(2023, 12, 30), 1, 2, 3),
+    (date(2023, 1, 10), 1, 9, 364),
+    (date(2023, 2, 28), 2, 29, 1),
+    (date(2023, 3, 1), 2, 29, 0),
+    (date(2024, 2, 28), 2, 29, 1),
+    (date(2024, 3, 1), 2, 29, 365),
+])
+def test_days_until(today, month, day, expected):
+    assert days_until(today, month, day) == expected
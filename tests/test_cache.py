@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+import cache
+from cache import MISSING, TTLCache
+from routes.metrics import cache_stats
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_get_returns_value_until_ttl_expires(clock):
+    ttl_cache = TTLCache("test-expiry", ttl=10)
+    ttl_cache.set("key", "value")
+    clock[0] += 9.9
+    assert ttl_cache.get("key") == "value"
+    clock[0] += 0.1
+    assert ttl_cache.get("key") is MISSING
+    assert ttl_cache.stats()["size"] == 0
+
+
+def test_per_entry_ttl_overrides_default(clock):
+    ttl_cache = TTLCache("test-entry-ttl", ttl=10)
+    ttl_cache.set("short", 1, ttl=1)
+    ttl_cache.set("long", 2)
+    clock[0] += 2
+    assert ttl_cache.get("short", None) is None
+    assert ttl_cache.get("long") == 2
+
+
+def test_cached_none_is_distinct_from_missing(clock):
+    ttl_cache = TTLCache("test-none", ttl=10)
+    ttl_cache.set("negative", None)
+    assert ttl_cache.get("negative") is None
+    assert ttl_cache.get("absent") is MISSING
+
+
+def test_maxsize_evicts_least_recently_used(clock):
+    ttl_cache = TTLCache("test-lru", ttl=10, maxsize=2)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    ttl_cache.get("a")
+    ttl_cache.set("c", 3)
+    assert ttl_cache.get("b") is MISSING
+    assert ttl_cache.get("a") == 1
+    assert ttl_cache.get("c") == 3
+
+
+def test_invalidate_key_or_everything_bumps_generation(clock):
+    ttl_cache = TTLCache("test-invalidate", ttl=10)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    generation = ttl_cache.generation
+    ttl_cache.invalidate("a")
+    assert ttl_cache.get("a") is MISSING
+    assert ttl_cache.get("b") == 2
+    ttl_cache.invalidate()
+    assert ttl_cache.get("b") is MISSING
+    assert ttl_cache.generation == generation + 2
+
+
+def test_stats_count_hits_and_misses(clock):
+    ttl_cache = TTLCache("test-stats", ttl=10)
+    ttl_cache.set("a", 1)
+    ttl_cache.get("a")
+    ttl_cache.get("a")
+    ttl_cache.get("b")
+    stats = ttl_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (2, 1, 0.6667)
+
+
+def test_notify_calls_subscribers_of_the_collection():
+    calls = []
+    cache.subscribe(("test-collection",), lambda *args: calls.append(args))
+    cache.notify("test-collection", upserted=[{"_id": 1}])
+    cache.notify("other-collection")
+    assert calls == [("test-collection", [{"_id": 1}], None)]
+
+
+def test_cache_stats_route_lists_every_cache(clock):
+    ttl_cache = TTLCache("test-registry", ttl=10)
+    ttl_cache.get("key")
+    stats = asyncio.run(cache_stats())
+    assert stats["test-registry"]["misses"] == 1
@@ -0,0 +1,39 @@
+import asyncio
+from types import SimpleNamespace
+
+import coherence
+import versions
+
+
+def bump(monkeypatch, versions):
+    dispatched = []
+    returned = iter(versions)
+
+    async def find_one_and_update(*args, **kwargs):
+        return {"_id": "events", "v": next(returned)}
+
+    monkeypatch.setattr(coherence, "versions", SimpleNamespace(find_one_and_update=find_one_and_update))
+    monkeypatch.setattr(coherence, "dispatch", dispatched.append)
+    monkeypatch.setattr(coherence, "_seen", {})
+    for _ in versions:
+        asyncio.run(coherence._bump("events"))
+    return dispatched
+
+
+def test_consecutive_bumps_do_not_invalidate(monkeypatch):
+    assert bump(monkeypatch, [1, 2, 3]) == []
+    assert coherence.seen()["events"] == 3
+
+
+def test_bump_over_a_foreign_write_invalidates(monkeypatch):
+    assert bump(monkeypatch, [1, 3]) == ["events"]
+    assert coherence.seen()["events"] == 3
+
+
+def test_stale_bump_is_ignored(monkeypatch):
+    assert bump(monkeypatch, [2, 1]) == ["events"]
+    assert coherence.seen()["events"] == 2
+
+
+def test_every_etag_collection_is_kept_coherent():
+    assert set(versions.TRACKED) <= set(coherence.WATCHED)
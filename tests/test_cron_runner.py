@@ -0,0 +1,32 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from cron_runner import TIMEZONE, next_run
+
+
+def local(*args) -> datetime:
+    return TIMEZONE.localize(datetime(*args))
+
+
+@pytest.mark.parametrize("spec, now, expected", [
+    ("07:00", local(2023, 1, 10, 6, 59), local(2023, 1, 10, 7, 0)),
+    ("07:00", local(2023, 1, 10, 7, 0), local(2023, 1, 11, 7, 0)),
+    ("mon 00:00", local(2023, 1, 1, 12, 0), local(2023, 1, 2, 0, 0)),
+    ("mon 00:00", local(2023, 1, 2, 0, 0), local(2023, 1, 9, 0, 0)),
+    ("01.01 00:00", local(2023, 6, 1, 0, 0), local(2024, 1, 1, 0, 0)),
+    ("01.01 00:00", local(2023, 12, 31, 23, 59), local(2024, 1, 1, 0, 0)),
+    ("29.02 12:00", local(2023, 1, 10, 0, 0), local(2024, 2, 29, 12, 0)),
+    ("29.02 12:00", local(2024, 2, 29, 13, 0), local(2028, 2, 29, 12, 0)),
+])
+def test_next_run(spec, now, expected):
+    assert next_run(spec, now) == expected
+
+
+def test_next_run_converts_to_local_time():
+    assert next_run("07:00", datetime(2023, 1, 10, 4, 30, tzinfo=timezone.utc)) == local(2023, 1, 10, 7, 0)
+
+
+def test_next_run_rejects_dates_that_never_occur():
+    with pytest.raises(ValueError):
+        next_run("31.04 00:00", local(2023, 1, 10, 0, 0))
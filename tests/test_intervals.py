@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+from intervals import DayIndex, Interval, LessonIndex
+
+LESSON = {"_id": "s1", "number": 2}
+
+
+def day_index() -> DayIndex:
+    return DayIndex([
+        Interval(2, 9 * 60 + 35, 10 * 60 + 55, 20, LESSON),
+        Interval(1, 8 * 60, 9 * 60 + 20, 15, None),
+        Interval(3, 11 * 60 + 15, 12 * 60 + 35, 20, None),
+    ])
+
+
+def test_lookup_inside_an_interval():
+    current, upcoming = day_index().lookup(8 * 60 + 30)
+    assert current.number == 1
+    assert upcoming.number == 2
+
+
+def test_lookup_at_boundaries():
+    index = day_index()
+    current, upcoming = index.lookup(9 * 60 + 35)
+    assert current.number == 2 and upcoming is None
+    current, upcoming = index.lookup(9 * 60 + 20)
+    assert current is None and upcoming.number == 2
+
+
+def test_lookup_outside_the_day():
+    index = day_index()
+    current, upcoming = index.lookup(6 * 60)
+    assert current is None and upcoming.number == 2
+    assert index.lookup(23 * 60) == (None, None)
+
+
+class FakeSnapshot:
+    ttl = 60
+    version = 1
+
+    async def entries(self, week_type, day_number):
+        return [LESSON]
+
+
+def test_only_known_week_types_are_memoized():
+    index = LessonIndex(FakeSnapshot())
+    index._timetable = [{"number": 2, "start_hour": 9, "start_minute": 35, "end_hour": 10, "end_minute": 55,
+                         "break_": 20}]
+    index._loaded_at = time.monotonic()
+    for i in range(100):
+        asyncio.run(index.now(f"random-{i}", 1, 600))
+    result = asyncio.run(index.now("Чисельник", 1, 600))
+    assert result["current"]["lesson"] == LESSON
+    assert list(index._days) == [("Чисельник", 1)]
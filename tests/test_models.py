@@ -0,0 +1,25 @@
+from datetime import datetime
+
+import pytest
+from pydantic import ValidationError
+
+from models import Birthday, LoginAttempt, Schedule
+
+
+def test_login_attempt_accepts_the_legacy_date_format():
+    attempt = LoginAttempt.parse_obj({"_id": "a", "user_id": 1, "username": "@u", "otp": 123456,
+                                      "attempt_date": "30.01.2023 00:50:23"})
+    assert attempt.attempt_date == "30.01.2023 00:50:23"
+    assert isinstance(LoginAttempt(user_id=1, username="@u").attempt_date, datetime)
+
+
+def test_schedule_requires_a_lesson_reference():
+    base = {"day": "Пн", "day_number": 1, "number": 1, "week_type": "-", "cabinet": "1"}
+    assert Schedule.parse_obj(dict(base, lesson_id="l1")).lesson_id == "l1"
+    with pytest.raises(ValidationError):
+        Schedule.parse_obj(base)
+
+
+def test_birthday_derives_day_of_year_on_a_leap_calendar():
+    birthday = Birthday.parse_obj({"student_name": "Іван", "date": "01.03.2003"})
+    assert (birthday.month, birthday.day, birthday.day_of_year) == (3, 1, 61)
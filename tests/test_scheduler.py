@@ -0,0 +1,79 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import scheduler as scheduler_module
+from scheduler import EventScheduler, parse_date
+
+DUE = parse_date("01.09.2030 10:00")
+
+
+class FakeEvents:
+    def __init__(self, *events):
+        self.documents = {event["_id"]: dict(event) for event in events}
+
+    async def find_one_and_update(self, query, update, return_document=None):
+        document = self.documents.get(query["_id"])
+        if document is None or "sent_at" in document:
+            return None
+        document.update(update["$set"])
+        return dict(document)
+
+
+@pytest.fixture
+def events(monkeypatch):
+    notified = []
+    events = FakeEvents({"_id": "e1", "name": "Exam", "description": "Room 1", "date": "01.09.2030 10:00"},
+                        {"_id": "e2", "name": "Party", "description": "", "date": "01.09.2030 12:00"})
+    monkeypatch.setattr(scheduler_module, "db", SimpleNamespace(events=events))
+    monkeypatch.setattr(scheduler_module.cache, "notify",
+                        lambda collection, upserted=None, deleted=None: notified.append((collection, upserted)))
+    events.notified = notified
+    return events
+
+
+def make_scheduler(events, now):
+    sent = []
+    scheduler = EventScheduler(chat_id=1, grace=300, clock=lambda: now[0], send=sent.append)
+    for event in events.documents.values():
+        scheduler.add(dict(event))
+    return scheduler, sent
+
+
+def test_due_event_is_sent_once_and_notified(events):
+    now = [DUE - 10]
+    scheduler, sent = make_scheduler(events, now)
+    assert asyncio.run(scheduler.run_due()) == pytest.approx(10)
+    assert sent == []
+    now[0] = DUE + 1
+    assert asyncio.run(scheduler.run_due()) == pytest.approx(2 * 3600 - 1)
+    assert [event["_id"] for event in sent] == ["e1"]
+    [(collection, [claimed])] = events.notified
+    assert collection == "events" and claimed["sent_at"] is not None and claimed["skipped"] is False
+
+
+def test_event_past_grace_is_marked_skipped(events):
+    now = [DUE + 301]
+    scheduler, sent = make_scheduler(events, now)
+    asyncio.run(scheduler.run_due())
+    assert sent == []
+    assert events.documents["e1"]["skipped"] is True
+    assert [upserted[0]["_id"] for _, upserted in events.notified] == ["e1"]
+
+
+def test_event_claimed_elsewhere_is_not_sent(events):
+    now = [DUE + 1]
+    scheduler, sent = make_scheduler(events, now)
+    events.documents["e1"]["sent_at"] = "elsewhere"
+    asyncio.run(scheduler.run_due())
+    assert sent == [] and events.notified == []
+
+
+def test_updated_and_deleted_events_are_rescheduled(events):
+    now = [DUE - 10]
+    scheduler, sent = make_scheduler(events, now)
+    scheduler.on_change("events", deleted=["e1"])
+    assert scheduler.next_due() == pytest.approx(DUE + 2 * 3600)
+    scheduler.on_change("events", upserted=[dict(events.documents["e2"], date="01.09.2030 09:00")])
+    assert scheduler.next_due() == pytest.approx(DUE - 3600)
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import snapshot as snapshot_module
+from snapshot import ALL, ScheduleSnapshot
+
+ITEMS = [
+    {"_id": "a", "day": "Пн", "day_number": 1, "number": 2, "week_type": "Чисельник", "cabinet": "1",
+     "lesson_id": "l1", "lesson": {"_id": "l1", "name": "Math", "short_name": "M", "type": "лек.", "teacher": "T"},
+     "lesson_display": "M лек."},
+    {"_id": "b", "day": "Пн", "day_number": 1, "number": 1, "week_type": "-", "cabinet": "2",
+     "lesson_id": "l1", "lesson": {"_id": "l1", "name": "Math", "short_name": "M", "type": "лек.", "teacher": "T"},
+     "lesson_display": "M лек."},
+]
+
+
+def loaded_snapshot() -> ScheduleSnapshot:
+    snapshot = ScheduleSnapshot(ttl=60)
+    snapshot._raw = {item["_id"]: item for item in ITEMS}
+    snapshot._items = {item["_id"]: snapshot._validate(item) for item in ITEMS}
+    snapshot._loaded_at = time.monotonic()
+    return snapshot
+
+
+def test_views_filter_by_week_type_and_sort():
+    snapshot = loaded_snapshot()
+    week = json.loads(asyncio.run(snapshot.view("Чисельник")))
+    assert [item["_id"] for item in week] == ["b", "a"]
+    other = json.loads(asyncio.run(snapshot.view("Знаменник", 1)))
+    assert [item["_id"] for item in other] == ["b"]
+    everything = json.loads(asyncio.run(snapshot.view()))
+    assert everything[0]["lesson"] == "M лек."
+
+
+def test_unknown_week_types_are_served_but_not_memoized():
+    snapshot = loaded_snapshot()
+    for i in range(100):
+        assert json.loads(asyncio.run(snapshot.view(f"random-{i}")))[0]["_id"] == "b"
+    asyncio.run(snapshot.view())
+    asyncio.run(snapshot.view("Чисельник", 3))
+    assert set(snapshot._views) == {ALL, ("Чисельник", 3)}
+
+
+def test_patch_replaces_views_touched_by_the_item():
+    snapshot = loaded_snapshot()
+    asyncio.run(snapshot.view("Знаменник"))
+    moved = dict(ITEMS[0], week_type="Знаменник")
+    snapshot._patch(upserted=[moved])
+    week = json.loads(asyncio.run(snapshot.view("Знаменник")))
+    assert [item["_id"] for item in week] == ["b", "a"]
+
+
+def test_reads_wait_for_refreshes_queued_by_writes(monkeypatch):
+    snapshot = loaded_snapshot()
+
+    async def refresh_view(collection, upserted, deleted):
+        await asyncio.sleep(0.01)
+        snapshot._patch(upserted=upserted)
+
+    async def scenario():
+        await snapshot.view("Знаменник")
+        snapshot.apply("schedule", upserted=[dict(ITEMS[0], week_type="Знаменник")])
+        return json.loads(await snapshot.view("Знаменник"))
+
+    monkeypatch.setattr(snapshot, "_refresh_view", refresh_view)
+    assert [item["_id"] for item in asyncio.run(scenario())] == ["b", "a"]
+
+
+def test_expired_snapshot_is_materialized_again(monkeypatch):
+    materialized = []
+
+    async def materialize(match=None):
+        materialized.append(match)
+
+    async def to_list(length):
+        return ITEMS
+
+    monkeypatch.setattr(snapshot_module, "materialize", materialize)
+    monkeypatch.setattr(snapshot_module.db, "schedule_view", SimpleNamespace(find=lambda: SimpleNamespace(
+        to_list=to_list)))
+    snapshot = loaded_snapshot()
+    snapshot._materialized = True
+    asyncio.run(snapshot.view())
+    assert materialized == []
+    snapshot._loaded_at -= 61
+    asyncio.run(snapshot.view())
+    assert materialized == [None]
+    assert snapshot.loaded
@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from telegram import TelegramError, TelegramSender, TokenBucket
+
+
+def test_token_bucket_take_reports_wait_without_consuming():
+    now = [0.0]
+    bucket = TokenBucket(0.5, 1, clock=lambda: now[0])
+    assert bucket.take() == 0
+    assert bucket.take() == pytest.approx(2)
+    assert bucket.take() == pytest.approx(2)
+    now[0] += 1.5
+    assert bucket.take() == pytest.approx(0.5)
+    now[0] += 0.5
+    assert bucket.take() == 0
+    now[0] += 100
+    assert bucket.idle
+
+
+def run_sender(handler, messages, **options):
+    async def scenario():
+        sender = TelegramSender(workers=1, global_rate=1000, max_retries=2, base_url="https://api.test",
+                                token="0:test", **options)
+        sender.start()
+        await sender.http.aclose()
+        sender.http = httpx.AsyncClient(base_url=sender.base_url, transport=httpx.MockTransport(handler))
+        results = await asyncio.gather(*(sender.send_message(chat_id, text) for chat_id, text in messages),
+                                       return_exceptions=True)
+        await sender.stop()
+        return results
+    return asyncio.run(scenario())
+
+
+def test_busy_group_does_not_block_private_chats():
+    delivered = []
+
+    def handler(request):
+        delivered.append(json.loads(request.content)["text"])
+        return httpx.Response(200, json={"ok": True, "result": {}})
+
+    messages = [(-100, f"announcement {i}") for i in range(3)] + [(42, "otp")]
+    run_sender(handler, messages, chat_rate=1000, group_rate=5)
+    assert delivered == ["announcement 0", "otp", "announcement 1", "announcement 2"]
+
+
+def test_rate_limited_message_is_retried_after_retry_after():
+    attempts = []
+
+    def handler(request):
+        attempts.append(json.loads(request.content)["text"])
+        if len(attempts) == 1:
+            return httpx.Response(429, json={"ok": False, "description": "Too Many Requests",
+                                             "parameters": {"retry_after": 0.05}})
+        return httpx.Response(200, json={"ok": True, "result": {"text": attempts[-1]}})
+
+    results = run_sender(handler, [(1, "first"), (2, "second")], chat_rate=1000)
+    assert attempts == ["first", "second", "first"]
+    assert results == [{"text": "first"}, {"text": "second"}]
+
+
+def test_client_errors_are_not_retried():
+    def handler(request):
+        return httpx.Response(400, json={"ok": False, "description": "Bad Request: chat not found"})
+
+    [result] = run_sender(handler, [(1, "hello")], chat_rate=1000)
+    assert isinstance(result, TelegramError) and result.status_code == 400
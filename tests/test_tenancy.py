@@ -0,0 +1,51 @@
+import asyncio
+
+import tenancy
+from cache import MISSING, TTLCache
+from config import DEFAULT_TENANT
+from tenancy import PerTenant, TenantMiddleware
+
+
+def test_ttl_cache_is_partitioned_by_tenant():
+    ttl_cache = TTLCache("test-tenants", ttl=60)
+    with tenancy.use("first"):
+        ttl_cache.set("key", "first value")
+    with tenancy.use("second"):
+        assert ttl_cache.get("key") is MISSING
+        ttl_cache.set("key", "second value")
+        ttl_cache.invalidate()
+    with tenancy.use("first"):
+        assert ttl_cache.get("key") == "first value"
+        assert ttl_cache.stats()["tenants"] == 2
+
+
+class Counter:
+    def __init__(self):
+        self.count = 0
+
+    def add(self, amount: int):
+        self.count += amount
+
+
+def test_per_tenant_methods_dispatch_lazily():
+    counters = PerTenant(lambda: Counter(), Counter)
+    add = counters.add
+    assert dict(counters.items()) == {}
+    with tenancy.use("first"):
+        add(1)
+    with tenancy.use("second"):
+        add(5)
+        assert counters.count == 5
+    with tenancy.use("first"):
+        assert counters.count == 1
+
+
+def test_middleware_strips_tenant_prefix_without_raw_path():
+    seen = []
+
+    async def app(scope, receive, send):
+        seen.append((scope["path"], scope["raw_path"], scope["root_path"], tenancy.get_tenant()))
+
+    scope = {"type": "http", "path": f"/t/{DEFAULT_TENANT}/schedule/", "raw_path": None, "headers": []}
+    asyncio.run(TenantMiddleware(app)(scope, None, None))
+    assert seen == [("/schedule/", b"/schedule/", f"/t/{DEFAULT_TENANT}", DEFAULT_TENANT)]
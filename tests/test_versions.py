@@ -0,0 +1,34 @@
+from starlette.requests import Request
+
+import versions
+
+
+def request_with(if_none_match: str) -> Request:
+    return Request({"type": "http", "headers": [(b"if-none-match", if_none_match.encode())]})
+
+
+def test_matches_any_tag_in_a_list_with_or_without_spaces():
+    assert versions.matches(request_with('"a","b"'), '"b"')
+    assert versions.matches(request_with('"a", "b"'), '"b"')
+    assert not versions.matches(request_with('"a","b"'), '"c"')
+
+
+def test_matches_weak_tags_and_wildcard():
+    assert versions.matches(request_with('W/"a"'), '"a"')
+    assert versions.matches(request_with('*'), '"a"')
+    assert not versions.matches(request_with(''), '"a"')
+
+
+def test_not_modified_returns_304_with_validators():
+    response = versions.not_modified(request_with('"x", "y"'), '"y"')
+    assert response.status_code == 304
+    assert response.headers["etag"] == '"y"'
+    assert versions.not_modified(request_with('"x"'), '"y"') is None
+    assert versions.not_modified(request_with('*'), None) is None
+
+
+def test_etag_changes_with_collection_generation():
+    before = versions.etag(("teachers",), "page")
+    versions.bump("teachers")
+    assert versions.etag(("teachers",), "page") != before
+    assert versions.etag(("timetable",)) is None
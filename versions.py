@@ -0,0 +1,50 @@
+import hashlib
+import uuid
+from collections import defaultdict
+from typing import Dict, Iterable, Optional
+
+from fastapi import Request, Response, status
+
+import tenancy
+from cache import subscribe
+
+TRACKED = ("birthdays", "lessons", "playlists", "schedule", "teachers", "week", "cron", "admins", "events")
+
+BOOT_ID = uuid.uuid4().hex
+generations: Dict[tuple, int] = defaultdict(int)
+
+
+def bump(collection: str, *args):
+    generations[tenancy.get_tenant(), collection] += 1
+
+
+subscribe(TRACKED, bump)
+
+
+def etag(collections: Iterable[str], *parts) -> Optional[str]:
+    collections = tuple(collections)
+    if any(collection not in TRACKED for collection in collections):
+        return None
+    tenant = tenancy.get_tenant()
+    raw = ":".join([BOOT_ID, tenant, *(f"{c}={generations[tenant, c]}" for c in collections), *map(str, parts)])
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+
+def headers(tag: Optional[str]) -> dict:
+    if tag is None:
+        return {}
+    return {"ETag": tag, "Cache-Control": "no-cache"}
+
+
+def matches(request: Request, tag: str) -> bool:
+    for value in request.headers.get("if-none-match", "").split(","):
+        value = value.strip()
+        if value == "*" or value.removeprefix("W/") == tag:
+            return True
+    return False
+
+
+def not_modified(request: Request, tag: Optional[str]) -> Optional[Response]:
+    if tag is not None and matches(request, tag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers(tag))
+    return None
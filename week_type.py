@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pytz
+
+import db
+from cache import TTLCache, MISSING, subscribe
+from config import WEEK_TYPE_CACHE_TTL
+
+TIMEZONE = pytz.timezone('Europe/Kiev')
+
+week_type_cache = TTLCache("week_type", WEEK_TYPE_CACHE_TTL)
+
+
+def invalidate(*args):
+    week_type_cache.invalidate()
+
+
+subscribe(("week",), invalidate)
+
+
+def seconds_until_next_week(now: Optional[datetime] = None) -> float:
+    now = now or datetime.now(tz=TIMEZONE)
+    monday = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    next_monday = TIMEZONE.normalize(monday + timedelta(days=7))
+    return (next_monday - now).total_seconds()
+
+
+async def current_week_type() -> Optional[str]:
+    if (value := week_type_cache.get("current")) is not MISSING:
+        return value
+    generation = week_type_cache.generation
+    document = await db.week.find_one({}, {"type": 1})
+    value = document["type"] if document is not None else None
+    if generation == week_type_cache.generation:
+        week_type_cache.set("current", value, ttl=min(week_type_cache.ttl, seconds_until_next_week()))
+    return value